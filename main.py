@@ -7,7 +7,15 @@ from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from src import INDEX_NAME, AppError, client, delete_old_data, router
+from src import (
+    INDEX_NAME,
+    AppError,
+    browser_session,
+    client,
+    delete_old_data,
+    http_session,
+    router,
+)
 
 
 @asynccontextmanager
@@ -26,6 +34,8 @@ async def lifespan(_: FastAPI):
         yield
     finally:
         scheduler.shutdown()
+        await browser_session.close()
+        await http_session.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -5,8 +5,10 @@ __all__ = [
     "InvitationOrm",
     "SEOResultOrm",
     "UserOrm",
+    "browser_session",
     "client",
     "delete_old_data",
+    "http_session",
     "router",
 ]
 
@@ -21,7 +23,9 @@ from .iam.database.models import (
 )
 from .seo.agents.rag import INDEX_NAME, client, delete_old_data
 from .seo.api import router as router_seo
+from .seo.core.http import http_session
 from .seo.database.repository import SEOResultOrm
+from .seo.utils.web_parser import browser_session
 
 router = APIRouter(prefix="/api/v1")
 router.include_router(router_seo)
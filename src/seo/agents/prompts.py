@@ -97,7 +97,7 @@ Google Core Web Vitals:
 
 
 PROMPT_RESULT = """
-Проанализируй данные: markdown {markdown}, HTML-анализ {seo_issue}, Core Web Vitals {cwv}.
+Проанализируй данные сайта: markdown, HTML-анализ и Core Web Vitals, переданные в конце запроса.
 
 **SEO РАСЧЁТ (начинай строго с 100 баллов):**
 
@@ -160,8 +160,32 @@ TTFB > 800 мс → -6
 
 {format_instructions}
 
+Markdown: {markdown}
+
+HTML-анализ: {seo_issue}
+
+Core Web Vitals: {cwv}
+
+"""  # noqa: E501
+
+PROMPT_RESULT_PARTIAL = """
+Ты — SEO-аналитик. Тебе передан один фрагмент страницы сайта: часть Markdown-контента и часть HTML-анализа. Составь по этому фрагменту краткие фактические заметки, которые потом будут объединены с заметками по остальным фрагментам:
+- найденные технические проблемы (title, description, заголовки, изображения без alt, семантические теги, ошибки) с указанием количества;
+- сильные стороны контента (экспертиза, структура, коммерческая и образовательная ценность);
+- слабые стороны контента.
+
+Не выставляй оценки и не делай выводов по всему сайту. Пиши только то, что есть во фрагменте. Вывод — короткий маркированный список без вступлений.
+
+Markdown фрагмента: {markdown}
+
+HTML-анализ фрагмента: {seo_issue}
 """  # noqa: E501
 
+PROMPT_RESULT_REDUCE = PROMPT_RESULT.replace(
+    "Markdown: {markdown}\n\nHTML-анализ: {seo_issue}",
+    "Заметки по фрагментам страницы (markdown и HTML-анализ): {partials}",
+)
+
 PROMPT_GENERATE_JSON_LD = """
 Ты — эксперт по Schema.org и структурированным данным. Твоя задача — из **переданного Markdown контента сайта** автоматически извлечь все доступные данные и сгенерировать **строго валидный, минимально достаточный и полностью соответствующий входным данным JSON-LD**.
 
@@ -275,11 +299,11 @@ PROMPT_ANALYZE_ROBOTS = """
    - Сгруппируй ботов по категориям (Search, AI, Archives, Others)
    - Предложи оптимальную структуру: сначала специфичные правила, потом общие
 
+Выведи **ТОЛЬКО** готовое содержимое файла robots.txt — без всяких пояснений, без ```markdown, без слов «вот ваш файл» и т.п.
+
 Вот robots.txt для анализа:
 {data}
 
-Выведи **ТОЛЬКО** готовое содержимое файла robots.txt — без всяких пояснений, без ```markdown, без слов «вот ваш файл» и т.п.
-
 """  # noqa: E501
 
 
@@ -422,10 +446,6 @@ PROMPT_GENERATE_AIO_CONTENT = """
 
 **Важно**: весь твой ответ должен быть написан строго на русском языке.
 
-### Вход
-
-{data}
-
 ### Формат ответа
 Твой ответ должен быть **строго в формате JSON** и содержать :
 {format_instructions}
@@ -438,6 +458,10 @@ PROMPT_GENERATE_AIO_CONTENT = """
 
 Никакого дополнительного текста, пояснений или Markdown-разметки вне JSON.
 
+### Вход
+
+{data}
+
 
 """  # noqa: E501
 
@@ -462,7 +486,7 @@ PROMPT_SUMMARIZE = """
 
 
 PROMPT_SPECIALIZATION = """
-Определи, чем занимается компания на основе содержимого страницы сайта: {data}
+Определи, чем занимается компания на основе содержимого страницы сайта.
 
 **Важно**: весь твой ответ должен быть написан строго на русском языке.
 
@@ -470,6 +494,8 @@ PROMPT_SPECIALIZATION = """
 
 {format_instructions}
 
+Содержимое страницы сайта:
+{data}
 
 """  # noqa: E501
 
@@ -485,13 +511,13 @@ PROMPT_EXPERTISE = """
 
 Ответ верни только в формате JSON.
 
-Markdown Сайта:
-{data}
-
 Вид ответа — Верни ответ **только** в формате JSON, без дополнительных пояснений, текста или Markdown. Ответ должен быть валидным JSON, к примеру:
 
 {format_instructions}
 
+Markdown Сайта:
+{data}
+
 
 """  # noqa: E501
 
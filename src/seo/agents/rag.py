@@ -1,3 +1,4 @@
+import asyncio
 import contextlib
 import json
 import logging
@@ -5,20 +6,21 @@ import re
 import time
 from collections.abc import Iterable
 from datetime import UTC, datetime, timedelta
+from functools import lru_cache
 from typing import Any
 from uuid import uuid4
 
 import chromadb
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 
 from ...settings import CHROMA_PATH
+from ..core.embeddings import hf_model
 
 INDEX_NAME = "main-index"
+QUERY_EMBEDDINGS_CACHE_SIZE = 512
 
 logger = logging.getLogger(__name__)
 
-hf_model = SentenceTransformer("deepvk/USER-bge-m3")
 client = chromadb.PersistentClient(CHROMA_PATH)
 splitter = RecursiveCharacterTextSplitter(chunk_size=1024, chunk_overlap=50, length_function=len)
 
@@ -98,9 +100,11 @@ async def indexing(
     # Генерируем уникальные ID для всех чанков
     ids = [str(uuid4()) for _ in chunks]
 
-    # Получаем эмбеддинги (можно оставить синхронно, если hf_model быстрый,
-    # или сделать асинхронным при необходимости)
-    embeddings = hf_model.encode_document(chunks, normalize_embeddings=False)
+    # Кодирование и запись в ChromaDB синхронные и блокируют event loop,
+    # поэтому выполняются в отдельном потоке
+    embeddings = await asyncio.to_thread(
+        hf_model.encode_document, chunks, normalize_embeddings=False
+    )
     embeddings_list = embeddings.tolist()  # type: ignore  # noqa: PGH003
 
     # Подготавливаем метаданные
@@ -119,7 +123,8 @@ async def indexing(
 
         logger.info("Adding batch %s with %s chunks to collection", batch_idx + 1, len(batch_ids))
 
-        collection.add(
+        await asyncio.to_thread(
+            collection.add,
             ids=batch_ids,
             documents=batch_docs,
             embeddings=batch_embs,
@@ -137,6 +142,12 @@ async def indexing(
     return added_ids
 
 
+@lru_cache(maxsize=QUERY_EMBEDDINGS_CACHE_SIZE)
+def _embed_query(query: str) -> tuple[float, ...]:
+    """Эмбеддинг поискового запроса, повторные запросы не кодируются заново"""
+    return tuple(hf_model.encode_query(query, normalize_embeddings=False).tolist())  # type: ignore  # noqa: PGH003
+
+
 def clean_text(text: str) -> str:
     """Очистка текста от экранированных символов и Unicode"""
     if not isinstance(text, str):
@@ -178,8 +189,8 @@ async def retrieve(
     logger.info("Retrieving for query: '%s...'", query[:50])
 
     # embedding = await get_embeddings([query])
-    embedding = hf_model.encode_query(query, normalize_embeddings=False)
-    params = {"query_embeddings": [embedding.tolist()], "n_results": n_results}  # type: ignore  # noqa: PGH003
+    embedding = await asyncio.to_thread(_embed_query, query)
+    params = {"query_embeddings": [list(embedding)], "n_results": n_results}
 
     if metadata_filter:
         if len(metadata_filter) == 0:
@@ -192,7 +203,9 @@ async def retrieve(
     if search_string:
         params["where_document"] = {"$contains": search_string}
 
-    result = collection.query(**params, include=["documents", "metadatas", "distances"])
+    result = await asyncio.to_thread(
+        collection.query, **params, include=["documents", "metadatas", "distances"]
+    )
 
     cleaned_results = []
     for document, metadata, distance in zip(
@@ -244,3 +257,10 @@ def delete_old_data(max_age_hours: int = 3) -> None:
 
     else:
         logger.info("Нет старых документов для удаления (старше %s часов)", max_age_hours)
+
+
+def delete_documents(ids: list[str]) -> None:
+    """Удаляет из ChromaDB чанки документа по их идентификаторам."""
+    if ids:
+        client.get_or_create_collection(INDEX_NAME).delete(ids=ids)
+        logger.info("Из RAG удалено %s чанков документа", len(ids))
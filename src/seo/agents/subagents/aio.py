@@ -1,11 +1,19 @@
+import asyncio
 import logging
 import operator
 from typing import Annotated, TypedDict
 
-from langchain.messages import AIMessage
+import orjson
 from langgraph.graph import END, START, StateGraph
 
-from ...core.depends import gpt_oss_120b, parser_aio_content, yandex_gpt
+from ...core.depends import (
+    aio_content_format_instructions,
+    gpt_oss_120b,
+    parser_aio_content,
+    structured_chain,
+    yandex_gpt,
+)
+from ...core.semantic_cache import semantic_cached_invoke
 from ...schemas import GenerateAIOContent
 from ...utils.checkup import get_json_ld, get_llms_data, get_robots_data
 from ..prompts import PROMPT_ANALYZE_ROBOTS, PROMPT_GENERATE_AIO_CONTENT
@@ -15,10 +23,12 @@ from .process import (
     generate_json_ld,
     generate_llms_txt,
 )
-from .utils import count_tokens
+from .utils import count_prompt_tokens, get_usage_tokens, num_tokens
 
 logger = logging.getLogger(__name__)
 
+_AIO_CONTENT_CHAIN = structured_chain(gpt_oss_120b, parser_aio_content)
+
 
 class State(TypedDict):
     url: str
@@ -29,78 +39,83 @@ class State(TypedDict):
     robots_txt: str
     llms_txt: str
     total_tokens: Annotated[int, operator.add]
+    cached_tokens: Annotated[int, operator.add]
     total_money: Annotated[float, operator.add]
 
 
 async def generate_aio_content(state: State) -> dict:
-    chain = gpt_oss_120b | parser_aio_content
-    request = PROMPT_GENERATE_AIO_CONTENT.format(
-        data=state["markdown"], format_instructions=parser_aio_content.get_format_instructions()
-    )
-    result: GenerateAIOContent = await chain.ainvoke(request)
+    fields = {"data": state["markdown"], "format_instructions": aio_content_format_instructions}
+    request = PROMPT_GENERATE_AIO_CONTENT.format(**fields)
+    result: GenerateAIOContent = await _AIO_CONTENT_CHAIN.ainvoke(request)
     logger.info("Генерация AIO контента")
-    total_tokens = await count_tokens(request, result.model_dump_json()) + state.get(
-        "total_tokens", 0
+    dumped = result.model_dump()
+    tokens = count_prompt_tokens(PROMPT_GENERATE_AIO_CONTENT, **fields) + num_tokens(
+        orjson.dumps(dumped).decode()
     )
-    total_money = (total_tokens / 1000 * 0.30) + state.get("total_money", 0)
     return {
-        "total_tokens": total_tokens,
-        "total_money": total_money,
-        "new_content": result.model_dump(),
+        "total_tokens": tokens,
+        "total_money": tokens / 1000 * 0.30,
+        "new_content": dumped,
     }
 
 
 async def create_lds(state: State) -> dict:
-    ld = get_json_ld(state["html"])
+    # Разбор HTML блокирует event loop, поэтому выносится в поток
+    # чтобы параллельные узлы графа не простаивали
+    ld = await asyncio.to_thread(get_json_ld, state["html"])
     if ld != []:
         analyze = await analyze_json_ld(ld)
         logger.info("Анализ json-ld контента")
-        total_money = (analyze["total_tokens"] / 1000 * 0.80) + state.get("total_money", 0)
         return {
             "json_ld": analyze["json_ld"],
-            "total_tokens": analyze["total_tokens"] + state.get("total_tokens", 0),
-            "total_money": total_money,
+            "total_tokens": analyze["total_tokens"],
+            "cached_tokens": analyze["cached_tokens"],
+            "total_money": analyze["total_tokens"] / 1000 * 0.80,
         }
     generate = await generate_json_ld(state["markdown"])
     logger.info("Генерация json-ld контента")
-    total_money = (generate["total_tokens"] / 1000 * 0.30) + state.get("total_money", 0)
     return {
         "json_ld": generate["json_ld"],
-        "total_tokens": generate["total_tokens"] + state.get("total_tokens", 0),
-        "total_money": total_money,
+        "total_tokens": generate["total_tokens"],
+        "cached_tokens": generate["cached_tokens"],
+        "total_money": generate["total_tokens"] / 1000 * 0.30,
     }
 
 
 async def change_robots_txt(state: State) -> dict:
     data = await get_robots_data(state["url"])
     request = PROMPT_ANALYZE_ROBOTS.format(data=data)
-    result: AIMessage = await yandex_gpt.ainvoke(request)
-    tokens = result.usage_metadata["total_tokens"]  # type: ignore  # noqa: PGH003
-    total_tokens = state.get("total_tokens", 0) + tokens
-    total_money = (tokens / 1000 * 0.80) + state.get("total_money", 0)
+    # Повторный анализ почти не изменившегося robots.txt сайта переиспользует ответ
+    result = await semantic_cached_invoke(
+        yandex_gpt, request, content=data, namespace="robots", site_url=state["url"]
+    )
+    tokens, cached_tokens = get_usage_tokens(result)
     logger.info("Изменение robots.txt")
-    return {"robots_txt": result.content, "total_tokens": total_tokens, "total_money": total_money}
+    return {
+        "robots_txt": result.content,
+        "total_tokens": tokens,
+        "cached_tokens": cached_tokens,
+        "total_money": tokens / 1000 * 0.80,
+    }
 
 
 async def create_llms_txt(state: State):
     llms_txt = await get_llms_data(state["url"])
     if llms_txt:
-        analyze = await analyze_llms_txt(llms_txt)
-        total_tokens = state.get("total_tokens", 0) + analyze["total_tokens"]
-        total_money = (analyze["total_tokens"] / 1000 * 0.30) + state.get("total_money", 0)
+        analyze = await analyze_llms_txt(llms_txt, url=state["url"])
         logger.info("Анализ llms контента")
         return {
-            "total_tokens": total_tokens,
+            "total_tokens": analyze["total_tokens"],
+            "cached_tokens": analyze["cached_tokens"],
             "llms_txt": analyze["llms_txt"],
-            "total_money": total_money,
+            "total_money": analyze["total_tokens"] / 1000 * 0.30,
         }
     generate = await generate_llms_txt(state["markdown"], url=state["url"])
-    total_tokens = state.get("total_tokens", 0) + generate["total_tokens"]
     logger.info("Генерация llms контента")
-    total_money = (generate["total_tokens"] / 1000 * 0.30) + state.get("total_money", 0)
     return {
-        "total_tokens": total_tokens,
-        "total_money": total_money,
+        "total_tokens": generate["total_tokens"],
+        "cached_tokens": generate["cached_tokens"],
+        "total_money": generate["total_tokens"] / 1000 * 0.30,
         "llms_txt": generate["llms_txt"],
     }
 
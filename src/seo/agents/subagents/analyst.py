@@ -2,15 +2,30 @@ import logging
 import operator
 from typing import Annotated, TypedDict
 
+import orjson
 from langgraph.graph import END, START, StateGraph
 
-from ...core.depends import gpt_oss_120b, parser_expertise, parser_sc, parser_specialization
+from ...core.depends import (
+    expertise_format_instructions,
+    gpt_oss_120b,
+    parser_expertise,
+    parser_sc,
+    parser_specialization,
+    sc_format_instructions,
+    specialization_format_instructions,
+    structured_chain,
+)
 from ...schemas import ExpertiseSite, SemanticCore, SpecializationSite
 from ..prompts import PROMPT_EXPERTISE, PROMPT_SEMANTIC_CORE, PROMPT_SPECIALIZATION
-from .utils import count_tokens
+from .utils import count_prompt_tokens, num_tokens
 
 logger = logging.getLogger(__name__)
 
+# Цепочки не зависят от запроса и собираются один раз
+_SPECIALIZATION_CHAIN = structured_chain(gpt_oss_120b, parser_specialization)
+_EXPERTISE_CHAIN = structured_chain(gpt_oss_120b, parser_expertise)
+_SEMANTIC_CORE_CHAIN = structured_chain(gpt_oss_120b, parser_sc)
+
 
 class State(TypedDict):
     url: str
@@ -23,55 +38,53 @@ class State(TypedDict):
 
 
 async def get_specialization(state: State) -> dict:
-    request = PROMPT_SPECIALIZATION.format(
-        format_instructions=parser_specialization.get_format_instructions(), data=state["markdown"]
-    )
-    chain = gpt_oss_120b | parser_specialization
-    result: SpecializationSite = await chain.ainvoke(request)
-    total_tokens = await count_tokens(request, result.model_dump_json()) + state.get(
-        "total_tokens", 0
+    fields = {
+        "format_instructions": specialization_format_instructions,
+        "data": state["markdown"],
+    }
+    request = PROMPT_SPECIALIZATION.format(**fields)
+    result: SpecializationSite = await _SPECIALIZATION_CHAIN.ainvoke(request)
+    dumped = result.model_dump()
+    tokens = count_prompt_tokens(PROMPT_SPECIALIZATION, **fields) + num_tokens(
+        orjson.dumps(dumped).decode()
     )
     logger.info("Получения специализации компании")
-    total_money = (total_tokens / 1000 * 0.30) + state.get("total_money", 0)
     return {
-        "specialization": result.model_dump(),
-        "total_tokens": total_tokens,
-        "total_money": total_money,
+        "specialization": dumped,
+        "total_tokens": tokens,
+        "total_money": tokens / 1000 * 0.30,
     }
 
 
 async def get_expertise(state: State) -> dict:
-    chain = gpt_oss_120b | parser_expertise
-    request = PROMPT_EXPERTISE.format(
-        data=state["markdown"],
-        format_instructions=parser_expertise.get_format_instructions(),
+    fields = {"data": state["markdown"], "format_instructions": expertise_format_instructions}
+    request = PROMPT_EXPERTISE.format(**fields)
+    result: ExpertiseSite = await _EXPERTISE_CHAIN.ainvoke(request)
+    dumped = result.model_dump()
+    tokens = count_prompt_tokens(PROMPT_EXPERTISE, **fields) + num_tokens(
+        orjson.dumps(dumped).decode()
     )
-    result: ExpertiseSite = await chain.ainvoke(request)
-    tokens = await count_tokens(request, result.model_dump_json())
-    total_tokens = tokens + state.get("total_tokens", 0)
     logger.info("Получения экспертизы компании")
-    total_money = (tokens / 1000 * 0.30) + state.get("total_money", 0)
     return {
-        "total_tokens": total_tokens,
-        "expertise": result.model_dump(),
-        "total_money": total_money,
+        "total_tokens": tokens,
+        "expertise": dumped,
+        "total_money": tokens / 1000 * 0.30,
     }
 
 
 async def get_semantic_core(state: State) -> dict:
-    request = PROMPT_SEMANTIC_CORE.format(
-        data=state["markdown"], format_instructions=parser_sc.get_format_instructions()
+    fields = {"data": state["markdown"], "format_instructions": sc_format_instructions}
+    request = PROMPT_SEMANTIC_CORE.format(**fields)
+    result: SemanticCore = await _SEMANTIC_CORE_CHAIN.ainvoke(request)
+    dumped = result.model_dump()
+    tokens = count_prompt_tokens(PROMPT_SEMANTIC_CORE, **fields) + num_tokens(
+        orjson.dumps(dumped).decode()
     )
-    chain = gpt_oss_120b | parser_sc
-    result: SemanticCore = await chain.ainvoke(request)
-    tokens = await count_tokens(request, result.model_dump_json())
-    total_tokens = tokens + state.get("total_tokens", 0)
     logger.info("Получения семантического ядра компании")
-    total_money = (tokens / 1000 * 0.30) + state.get("total_money", 0)
     return {
-        "total_tokens": total_tokens,
-        "semantic_core": result.model_dump(),
-        "total_money": total_money,
+        "total_tokens": tokens,
+        "semantic_core": dumped,
+        "total_money": tokens / 1000 * 0.30,
     }
 
 
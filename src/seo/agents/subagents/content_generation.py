@@ -3,12 +3,12 @@ import operator
 from typing import Annotated, TypedDict
 from urllib.parse import urljoin, urlparse
 
-from bs4 import BeautifulSoup
 from langchain.messages import AIMessage
 from langgraph.graph import END, START, StateGraph
 
 from ...core.depends import gpt_oss_120b
 from ...utils.layout_structure import (
+    collect_tags_from_html,
     validate_description,
     validate_heading,
     validate_images,
@@ -20,6 +20,7 @@ from ..prompts import (
     PROMPT_GENERATE_TITLE,
 )
 from .process import process_all_images
+from .utils import get_usage_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -33,65 +34,68 @@ class State(TypedDict):
     h1: str
     alt_tags: list[str] | str
     total_tokens: Annotated[int, operator.add]
+    cached_tokens: Annotated[int, operator.add]
     total_money: Annotated[float, operator.add]
 
 
 async def create_title(state: State) -> dict:
-    soup = BeautifulSoup(state["html"], "html.parser")
-    validate = validate_title(soup)
+    validate = validate_title(collect_tags_from_html(state["html"]))
     logger.info("Генерация title")
     if validate != []:
         request = PROMPT_GENERATE_TITLE.format(
             data=state["markdown"], analyze=validate[0].model_dump()
         )
         result: AIMessage = await gpt_oss_120b.ainvoke(request)
-        total_tokens = result.usage_metadata["total_tokens"] + state.get("total_tokens", 0)  # type: ignore  # noqa: PGH003
-        total_money = (total_tokens / 1000 * 0.30) + state.get("total_money", 0)
-        return {"title": result.content, "total_tokens": total_tokens, "total_money": total_money}
+        tokens, cached_tokens = get_usage_tokens(result)
+        return {
+            "title": result.content,
+            "total_tokens": tokens,
+            "cached_tokens": cached_tokens,
+            "total_money": tokens / 1000 * 0.30,
+        }
 
     return {"title": "У вас правильно написан заголовок", "total_tokens": 0, "total_money": 0}
 
 
 async def create_description(state: State) -> dict:
-    soup = BeautifulSoup(state["html"], "html.parser")
-    validate = validate_description(soup)
+    validate = validate_description(collect_tags_from_html(state["html"]))
     logger.info("Генерация description")
     if validate != []:
         request = PROMPT_GENERATE_DESCRIPTION.format(
             data=state["markdown"], analyze=validate[0].model_dump()
         )
         result: AIMessage = await gpt_oss_120b.ainvoke(request)
-        tokens = result.usage_metadata["total_tokens"]  # type: ignore  # noqa: PGH003
-        total_tokens = state.get("total_tokens", 0) + tokens
-        total_money = (tokens / 1000 * 0.30) + state.get("total_money", 0)
+        tokens, cached_tokens = get_usage_tokens(result)
         return {
             "description": result.content,
-            "total_tokens": total_tokens,
-            "total_money": total_money,
+            "total_tokens": tokens,
+            "cached_tokens": cached_tokens,
+            "total_money": tokens / 1000 * 0.30,
         }
     return {"description": "У вас правильное описание страницы"}
 
 
 async def create_h1(state: State) -> dict:
-    soup = BeautifulSoup(state["html"], "html.parser")
-    validate = validate_heading(soup)
+    validate = validate_heading(collect_tags_from_html(state["html"]))
     logger.info("Генерация h1")
     if validate != []:
         analyze = [i.model_dump() for i in validate]
         request = PROMPT_GENERATE_H1.format(data=state["markdown"], analyze=analyze)
-        result = await gpt_oss_120b.ainvoke(request)
-        tokens = result.usage_metadata["total_tokens"]  # type: ignore  # noqa: PGH003
-        total_tokens = state.get("total_tokens", 0) + tokens
-        total_money = (tokens / 1000 * 0.30) + state.get("total_money", 0)
-        return {"h1": result.content, "total_tokens": total_tokens, "total_money": total_money}
+        result: AIMessage = await gpt_oss_120b.ainvoke(request)
+        tokens, cached_tokens = get_usage_tokens(result)
+        return {
+            "h1": result.content,
+            "total_tokens": tokens,
+            "cached_tokens": cached_tokens,
+            "total_money": tokens / 1000 * 0.30,
+        }
     return {"h1": "Тег H1 правильно написан"}
 
 
 async def create_alts(state: State) -> dict:
     parsed = urlparse(state["url"])
     base_url = f"{parsed.scheme}://{parsed.netloc}"
-    soup = BeautifulSoup(state["html"], "html.parser")
-    validate = validate_images(soup)
+    validate = validate_images(collect_tags_from_html(state["html"]))
     logger.info("Генерация alts")
     if isinstance(validate, tuple):
         modified_urls: list = []
@@ -105,9 +109,7 @@ async def create_alts(state: State) -> dict:
                 absolute_url = urljoin(base_url, url)
                 modified_urls.append(absolute_url)
         tags, tokens = await process_all_images(modified_urls)
-        total_tokens = state.get("total_tokens", 0) + tokens
-        total_money = (tokens / 1000 * 0.40) + state.get("total_money", 0)
-        return {"alt_tags": tags, "total_tokens": total_tokens, "total_money": total_money}
+        return {"alt_tags": tags, "total_tokens": tokens, "total_money": tokens / 1000 * 0.40}
     return {"alt_tags": "Изображений на сайте нету либо они определены в неправильном теге"}
 
 
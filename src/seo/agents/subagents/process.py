@@ -1,17 +1,22 @@
 import base64
-import json
 
-import aiohttp
+import orjson
 from langchain.messages import AIMessage
 
-from ...core.constants import BATCH_SIZE, REQUEST_TIMEOUT, STATUS_OK
+from ...core.cache import cached_invoke
+from ...core.constants import BATCH_SIZE, STATUS_OK
 from ...core.depends import (
     gemma_3_27b_it,
+    generated_alt_format_instructions,
     gpt_oss_120b,
+    markdown_format_instructions,
     parser_generated_alt,
     parser_markdown,
+    structured_chain,
     yandex_gpt,
 )
+from ...core.http import http_session
+from ...core.semantic_cache import semantic_cached_invoke
 from ...schemas import SEOAnalysisReport
 from ..prompts import (
     PROMPT_ANALYZE_JSON_LD,
@@ -22,48 +27,66 @@ from ..prompts import (
     PROMPT_MARKDOWN,
     PROMPT_SUMMARIZE,
 )
-from .utils import count_tokens, get_mime, is_image
+from .utils import (
+    anum_tokens,
+    count_prompt_tokens,
+    get_mime,
+    get_usage_tokens,
+    is_image,
+    num_tokens,
+)
+
+_MARKDOWN_CHAIN = structured_chain(gpt_oss_120b, parser_markdown)
+_ALT_CHAIN = gemma_3_27b_it | parser_generated_alt
 
 
 async def analyze_json_ld(ld: list) -> dict:
     request = PROMPT_ANALYZE_JSON_LD.format(json_ld=ld)
-    result: AIMessage = await yandex_gpt.ainvoke(request)
-
-    return {"json_ld": result.content, "total_tokens": result.usage_metadata["total_tokens"]}  # type: ignore  # noqa: PGH003
+    result = await cached_invoke(yandex_gpt, request)
+    total_tokens, cached_tokens = get_usage_tokens(result)
+    return {"json_ld": result.content, "total_tokens": total_tokens, "cached_tokens": cached_tokens}
 
 
 async def generate_json_ld(markdown: list) -> dict:
     request = PROMPT_GENERATE_JSON_LD.format(data=markdown)
-    result = await gpt_oss_120b.ainvoke(request)
-    return {"json_ld": result.content, "total_tokens": result.usage_metadata["total_tokens"]}  # type: ignore  # noqa: PGH003
+    result: AIMessage = await gpt_oss_120b.ainvoke(request)  # type: ignore  # noqa: PGH003
+    total_tokens, cached_tokens = get_usage_tokens(result)
+    return {"json_ld": result.content, "total_tokens": total_tokens, "cached_tokens": cached_tokens}
 
 
-async def analyze_llms_txt(txt: str) -> dict:
+async def analyze_llms_txt(txt: str, url: str) -> dict:
     request = PROMPT_ANALYZE_LLMS_TXT.format(data=txt)
-    result = await yandex_gpt.ainvoke(request)
-    return {"llms_txt": result.content, "total_tokens": result.usage_metadata["total_tokens"]}  # type: ignore  # noqa: PGH003
+    result = await semantic_cached_invoke(
+        yandex_gpt, request, content=txt, namespace="llms", site_url=url
+    )
+    total_tokens, cached_tokens = get_usage_tokens(result)
+    return {"llms_txt": result.content, "total_tokens": total_tokens, "cached_tokens": cached_tokens}
 
 
 async def generate_llms_txt(markdown: list[str], url: str) -> dict:
-    total_tokens = 0
+    # Суммаризация описывает страницу целиком, поэтому выполняется одним запросом
     request_summarize = PROMPT_SUMMARIZE.format(data=markdown)
-    summarize: AIMessage = await gpt_oss_120b.ainvoke(request_summarize)
-
-    total_tokens += summarize.usage_metadata["total_tokens"]  # type: ignore  # noqa: PGH003
+    summarize = await cached_invoke(gpt_oss_120b, request_summarize)
+    summarize_tokens, summarize_cached_tokens = get_usage_tokens(summarize)
     request = PROMPT_GENERATE_LLMS_TXT.format(data={"url": url, "data": summarize.content})
-    result: AIMessage = await yandex_gpt.ainvoke(request)
-    total_tokens += result.usage_metadata["total_tokens"]  # type: ignore  # noqa: PGH003
-    return {"llms_txt": result.content, "total_tokens": total_tokens}
+    result: AIMessage = await yandex_gpt.ainvoke(request)  # type: ignore  # noqa: PGH003
+    total_tokens, cached_tokens = get_usage_tokens(result)
+    return {
+        "llms_txt": result.content,
+        "total_tokens": summarize_tokens + total_tokens,
+        "cached_tokens": summarize_cached_tokens + cached_tokens,
+    }
 
 
 async def analyze_markdown(markdown: list[str]) -> tuple:
-    request = PROMPT_MARKDOWN.format(
-        query=markdown, format_instructions=parser_markdown.get_format_instructions()
-    )  # noqa: E501, RUF100
-    chain = gpt_oss_120b | parser_markdown
-    result: SEOAnalysisReport = await chain.ainvoke(request)
-    total_tokens = await count_tokens(request, result.model_dump_json())
-    return result.model_dump(), total_tokens
+    fields = {"query": markdown, "format_instructions": markdown_format_instructions}
+    request = PROMPT_MARKDOWN.format(**fields)
+    result: SEOAnalysisReport = await _MARKDOWN_CHAIN.ainvoke(request)
+    dumped = result.model_dump()
+    total_tokens = count_prompt_tokens(PROMPT_MARKDOWN, **fields) + num_tokens(
+        orjson.dumps(dumped).decode()
+    )
+    return dumped, total_tokens
 
 
 async def _process_image_chunk(links: list[str]) -> tuple[list, int]:
@@ -74,30 +97,30 @@ async def _process_image_chunk(links: list[str]) -> tuple[list, int]:
     alt_texts = []
     total_tokens = 0
     batch = []
-    async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as session:
-        for link in links:
-            if not is_image(link):
+    session = await http_session.get_session()
+    for link in links:
+        if not is_image(link):
+            continue
+        async with session.get(link, ssl=False) as response:
+            if response.status != STATUS_OK:
+                continue
+            data = await response.read()
+            mime = await get_mime(link, data)
+            if mime == "image/svg+xml":
                 continue
-            async with session.get(link, ssl=False) as response:
-                if response.status != STATUS_OK:
-                    continue
-                data = await response.read()
-                mime = await get_mime(link, data)
-                if mime == "image/svg+xml":
-                    continue
-                base64_str = base64.b64encode(data).decode("utf-8")
-                batch.append({"image": base64_str, "type": mime, "url": link})
-
-                if len(batch) == BATCH_SIZE:
-                    alt, tokens = await _generate_alt(batch)
-                    alt_texts.append(alt)
-                    total_tokens += tokens
-                    batch.clear()
-
-        if batch:
-            alt, tokens = await _generate_alt(batch)
-            alt_texts.append(alt)
-            total_tokens += tokens
+            base64_str = base64.b64encode(data).decode("utf-8")
+            batch.append({"image": base64_str, "type": mime, "url": link})
+
+            if len(batch) == BATCH_SIZE:
+                alt, tokens = await _generate_alt(batch)
+                alt_texts.append(alt)
+                total_tokens += tokens
+                batch.clear()
+
+    if batch:
+        alt, tokens = await _generate_alt(batch)
+        alt_texts.append(alt)
+        total_tokens += tokens
     return alt_texts, total_tokens
 
 
@@ -133,10 +156,9 @@ async def process_all_images(all_links: list[str]) -> tuple[list[str], int]:
 
 
 async def _generate_alt(images_batch: list[dict]) -> tuple[list, int]:
-    chain = gemma_3_27b_it | parser_generated_alt
     request = PROMPT_GENERATE_ALT.format(
         urls=[img["url"] for img in images_batch],
-        format_instructions=parser_generated_alt.get_format_instructions(),
+        format_instructions=generated_alt_format_instructions,
     )
 
     content: list[dict] = [{"type": "text", "text": request}]
@@ -150,8 +172,9 @@ async def _generate_alt(images_batch: list[dict]) -> tuple[list, int]:
             ]
         )
 
-    count_request = gemma_3_27b_it.get_num_tokens(json.dumps(content))
-    response = await chain.ainvoke(
+    # Запрос содержит изображения в base64 и может занимать мегабайты
+    count_request = await anum_tokens(orjson.dumps(content).decode())
+    response = await _ALT_CHAIN.ainvoke(
         [
             {
                 "role": "user",
@@ -160,5 +183,5 @@ async def _generate_alt(images_batch: list[dict]) -> tuple[list, int]:
         ]
     )
     result = [i.model_dump() for i in response.result]
-    count_response = gemma_3_27b_it.get_num_tokens(json.dumps(result))
+    count_response = num_tokens(orjson.dumps(result).decode())
     return result, count_request + count_response
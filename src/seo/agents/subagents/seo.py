@@ -1,31 +1,41 @@
-import json
+import asyncio
 import logging
 import operator
+from itertools import zip_longest
 from typing import Annotated, TypedDict
 
+import orjson
+from langchain.messages import AIMessage
 from langgraph.graph import END, START, StateGraph
 
+from ...core.constants import SUMMARIZE_CONCURRENCY
 from ...core.depends import (
     cwv_prompt_template,
     gpt_oss_120b,
     parser_cwv,
     parser_result,
+    result_format_instructions,
+    structured_chain,
     text_splitter,
     yandex_gpt,
 )
 from ...integrations.google_psi_api import run_page_speed
 from ...schemas import CWVReport, SiteAnalysisReport
-from ..prompts import PROMPT_RESULT
+from ..prompts import PROMPT_RESULT, PROMPT_RESULT_PARTIAL, PROMPT_RESULT_REDUCE
 from .process import analyze_markdown
-from .utils import get_seo_issues
+from .utils import count_prompt_tokens, get_seo_issues, num_tokens
 
 logger = logging.getLogger(__name__)
 
+_CWV_CHAIN = cwv_prompt_template | structured_chain(yandex_gpt, parser_cwv)
+_RESULT_CHAIN = structured_chain(gpt_oss_120b, parser_result)
+
 
 class State(TypedDict):
     url: str
     markdown: list[str]
     html: str
+    page_speed: dict
     analyze_md: dict
     seo_issue: list[dict]
     cwv: CWVReport
@@ -35,48 +45,82 @@ class State(TypedDict):
 
 
 async def analyze_markups(state: State) -> dict:
-    result, tokens = await analyze_markdown(state["markdown"])
-    total_tokens = tokens + state.get("total_tokens", 0)
-    seo_issue = await get_seo_issues(state["html"])
+    # Разбор HTML выполняется в потоке одновременно с запросом к LLM
+    (result, tokens), seo_issue = await asyncio.gather(
+        analyze_markdown(state["markdown"]),
+        asyncio.to_thread(get_seo_issues, state["html"]),
+    )
     logger.info("Анализ разметки сайта")
     return {
         "analyze_md": result,
         "seo_issue": seo_issue,
-        "total_tokens": total_tokens,
+        "total_tokens": tokens,
     }
 
 
 async def get_core_web_vitals(state: State) -> dict:
-    cwv = await run_page_speed(state["url"])
-    chain = cwv_prompt_template | yandex_gpt | parser_cwv
-    count_cwv = yandex_gpt.get_num_tokens(str(cwv))
-    result: CWVReport = await chain.ainvoke({"query": cwv})
-    count_result = yandex_gpt.get_num_tokens(str(result))
-    total_tokens = count_cwv + count_result + state.get("total_tokens", 0)
+    cwv = state.get("page_speed") or await run_page_speed(state["url"])
+    count_cwv = num_tokens(str(cwv))
+    result: CWVReport = await _CWV_CHAIN.ainvoke({"query": cwv})
+    dumped = result.model_dump()
+    count_result = num_tokens(orjson.dumps(dumped).decode())
+    tokens = count_cwv + count_result
     logger.info("Получение CWV")
-    total_money = (total_tokens / 1000 * 0.80) + state.get("total_money", 0)
-    return {"cwv": result.model_dump(), "total_tokens": total_tokens, "total_money": total_money}
+    return {"cwv": dumped, "total_tokens": tokens, "total_money": tokens / 1000 * 0.80}
+
+
+async def _analyze_fragment(
+    markdown: str, seo_issue: str, semaphore: asyncio.Semaphore
+) -> tuple[str, int]:
+    """Анализирует один фрагмент страницы (map-шаг итогового SEO отчёта)."""
+    fields = {"markdown": markdown, "seo_issue": seo_issue}
+    request = PROMPT_RESULT_PARTIAL.format(**fields)
+    async with semaphore:
+        result: AIMessage = await gpt_oss_120b.ainvoke(request)  # type: ignore  # noqa: PGH003
+    content = str(result.content)
+    return content, count_prompt_tokens(PROMPT_RESULT_PARTIAL, **fields) + num_tokens(content)
 
 
 async def final_result(state: State) -> dict:
-    chain = gpt_oss_120b | parser_result
-    dumps_issue = json.dumps(state["seo_issue"])
+    dumps_issue = orjson.dumps(state["seo_issue"]).decode()
     split_issue = text_splitter.split_text(dumps_issue)
-    request = PROMPT_RESULT.format(
-        markdown=state["markdown"],
-        seo_issue=split_issue,
-        cwv=state["cwv"],
-        format_instructions=parser_result.get_format_instructions(),
-    )
-    count_data = yandex_gpt.get_num_tokens(request)
-
-    result: SiteAnalysisReport = await chain.ainvoke(request)
-    count_result = yandex_gpt.get_num_tokens(result.model_dump_json())
+    if len(state["markdown"]) <= 1 and len(split_issue) <= 1:
+        fields = {
+            "markdown": state["markdown"],
+            "seo_issue": split_issue,
+            "cwv": state["cwv"],
+            "format_instructions": result_format_instructions,
+        }
+        request = PROMPT_RESULT.format(**fields)
+        count_data = count_prompt_tokens(PROMPT_RESULT, **fields)
+    else:
+        # Каждый фрагмент анализируется отдельным небольшим запросом,
+        # а итоговый отчёт строится по собранным заметкам
+        semaphore = asyncio.Semaphore(SUMMARIZE_CONCURRENCY)
+        partials = await asyncio.gather(
+            *(
+                _analyze_fragment(markdown, seo_issue, semaphore)
+                for markdown, seo_issue in zip_longest(
+                    state["markdown"], split_issue, fillvalue=""
+                )
+            )
+        )
+        fields = {
+            "partials": "\n\n".join(content for content, _ in partials),
+            "cwv": state["cwv"],
+            "format_instructions": result_format_instructions,
+        }
+        request = PROMPT_RESULT_REDUCE.format(**fields)
+        count_data = count_prompt_tokens(PROMPT_RESULT_REDUCE, **fields) + sum(
+            tokens for _, tokens in partials
+        )
+
+    result: SiteAnalysisReport = await _RESULT_CHAIN.ainvoke(request)
+    dumped = result.to_dict
+    count_result = num_tokens(orjson.dumps(dumped).decode())
     tokens = count_data + count_result
-    total_tokens = state["total_tokens"] + tokens
     logger.info("Результат SEO")
-    total_money = (tokens / 1000 * 0.30) + state["total_money"]
-    return {"result": result.to_dict, "total_tokens": total_tokens, "total_money": total_money}
+    return {"result": dumped, "total_tokens": tokens, "total_money": tokens / 1000 * 0.30}
 
 
 builder = StateGraph(State)
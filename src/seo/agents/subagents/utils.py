@@ -1,22 +1,33 @@
+import asyncio
 import logging
 import mimetypes
 import os
+import string
+from collections import OrderedDict
+from functools import lru_cache
 from urllib.parse import unquote, urlparse
 
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
+import tiktoken
+from langchain.messages import AIMessage
 
-from ....settings import settings
 from ...core.constants import ALLOWED_EXT
 from ...core.depends import (
     text_splitter,
     yandex_gpt,
 )
-from ...utils.layout_structure import find_seo_issues
-from ...utils.web_parser import get_html_content, get_markdown_content
+from ...utils.layout_structure import parse_and_audit
+from ...utils.web_parser import browser_session, get_html_and_markdown
 
 logger = logging.getLogger(__name__)
 
+TOKENS_CACHE_SIZE = 4096
+# Модели Yandex Cloud неизвестны tiktoken, для них используется базовая кодировка
+TOKENS_FALLBACK_ENCODING = "cl100k_base"
+# Тексты длиннее порога токенизируются в отдельном потоке, чтобы не блокировать event loop
+TOKENS_THREAD_THRESHOLD = 100_000
+# Кэш количества токенов, ключ - (хэш, длина) текста, чтобы не хранить сами строки
+_tokens_cache: OrderedDict[tuple[int, int], int] = OrderedDict()
+
 
 async def get_mime(url: str, data: bytes) -> str:
     """Определяет MIME-тип изображения по URL и содержимому."""
@@ -44,15 +55,101 @@ def is_image(url):
     return ext in ALLOWED_EXT
 
 
-async def count_tokens(request: str, result: str) -> int:
-    count_request = yandex_gpt.get_num_tokens(request)
-    count_result = yandex_gpt.get_num_tokens(result)
-    return count_request + count_result
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding:
+    """Токенизатор модели, создаётся один раз на процесс"""
+    try:
+        return tiktoken.encoding_for_model(yandex_gpt.model_name)
+    except KeyError:
+        return tiktoken.get_encoding(TOKENS_FALLBACK_ENCODING)
+
+
+def _cached_tokens(key: tuple[int, int]) -> int | None:
+    count = _tokens_cache.get(key)
+    if count is not None:
+        _tokens_cache.move_to_end(key)
+    return count
+
+
+def _cache_tokens(key: tuple[int, int], count: int) -> None:
+    _tokens_cache[key] = count
+    if len(_tokens_cache) > TOKENS_CACHE_SIZE:
+        _tokens_cache.popitem(last=False)
+
+
+def num_tokens(text: str) -> int:
+    """Подсчитывает количество токенов в тексте локальным токенизатором"""
+    key = (hash(text), len(text))
+    count = _cached_tokens(key)
+    if count is None:
+        count = len(_get_encoding().encode_ordinary(text))
+        _cache_tokens(key, count)
+    return count
+
+
+async def anum_tokens(text: str) -> int:
+    """Подсчитывает токены, вынося токенизацию больших текстов в отдельный поток.
+
+    Кэш обновляется только из event loop, в потоке выполняется лишь кодирование.
+    """
+    if len(text) < TOKENS_THREAD_THRESHOLD:
+        return num_tokens(text)
+    key = (hash(text), len(text))
+    count = _cached_tokens(key)
+    if count is None:
+        tokens = await asyncio.to_thread(_get_encoding().encode_ordinary, text)
+        count = len(tokens)
+        _cache_tokens(key, count)
+    return count
+
+
+def num_tokens_batch(texts: list[str]) -> list[int]:
+    """Подсчитывает токены для нескольких текстов за один вызов токенизатора.
+
+    Тексты, которых нет в кэше, кодируются пакетно в пуле потоков tiktoken.
+    """
+    keys = [(hash(text), len(text)) for text in texts]
+    counts = [_cached_tokens(key) for key in keys]
+    missing = [i for i, count in enumerate(counts) if count is None]
+    if missing:
+        encoded = _get_encoding().encode_ordinary_batch([texts[i] for i in missing])
+        for i, tokens in zip(missing, encoded, strict=True):
+            counts[i] = len(tokens)
+            _cache_tokens(keys[i], len(tokens))
+    return counts  # type: ignore  # noqa: PGH003
+
+
+@lru_cache(maxsize=64)
+def _template_tokens(template: str) -> int:
+    """Количество токенов в статической части шаблона промпта"""
+    return num_tokens("".join(literal for literal, *_ in string.Formatter().parse(template)))
+
+
+def count_prompt_tokens(template: str, **fields: object) -> int:
+    """Подсчитывает токены промпта без токенизации уже собранного запроса.
+
+    Статическая часть шаблона считается один раз, при вызове токенизируются
+    только подставляемые значения. Результат приблизительный на границах
+    подстановок, но достаточен для оценки стоимости запроса.
+
+    :param template: Шаблон промпта.
+    :param fields: Значения, подставляемые в шаблон.
+    :return Количество токенов запроса.
+    """
+    return _template_tokens(template) + sum(num_tokens_batch([str(v) for v in fields.values()]))
+
+
+def get_usage_tokens(result: AIMessage) -> tuple[int, int]:
+    """Получает из ответа модели общее количество токенов и количество токенов
+    запроса, прочитанных из кэша провайдера.
+    """
+    usage = result.usage_metadata or {}
+    cached_tokens = usage.get("input_token_details", {}).get("cache_read", 0)
+    return usage.get("total_tokens", 0), cached_tokens
 
 
-async def get_seo_issues(html: str) -> list:
-    bs = BeautifulSoup(html, "html.parser")
-    issue = find_seo_issues(bs)
+def get_seo_issues(html: str) -> list:
+    issue = parse_and_audit(html)
     result: list = []
     for i in issue:
         if isinstance(i, tuple):
@@ -64,9 +161,7 @@ async def get_seo_issues(html: str) -> list:
 
 
 async def parce_site_markups(url: str) -> tuple | None:
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.connect(ws_endpoint=settings.chromium_ws_endpoint)
-        markdown = await get_markdown_content(browser, url)
-        html = await get_html_content(browser, url)
-        splited_markdown = text_splitter.split_text(markdown)
-        return splited_markdown, html
+    browser = await browser_session.get_browser()
+    html, markdown = await get_html_and_markdown(browser, url)
+    splited_markdown = text_splitter.split_text(markdown)
+    return splited_markdown, html
@@ -1,13 +1,18 @@
+import logging
 import operator
 from typing import Annotated, TypedDict
 
+import aiohttp
 from langgraph.graph import END, START, StateGraph
 
+from ..integrations.google_psi_api import run_page_speed
 from .subagents import agent_analyst, agent_content_generation, agent_seo
 from .subagents.utils import parce_site_markups
 
+logger = logging.getLogger(__name__)
 
-class State(TypedDict):
+
+class OutputState(TypedDict):
     url: str
     html: str
     markdown: list[str]
@@ -15,18 +20,36 @@ class State(TypedDict):
     seo_result: dict
     content_generation_result: dict
     total_tokens: Annotated[int, operator.add]
+    cached_tokens: Annotated[int, operator.add]
     total_money: Annotated[float, operator.add]
 
 
+class State(OutputState):
+    # Сырой ответ PageSpeed нужен только узлу SEO и не возвращается из графа
+    page_speed: dict
+
+
 async def get_site_markups(state: State) -> dict:
     markdown, html = await parce_site_markups(state["url"])  # type: ignore  # noqa: PGH003
     return {"markdown": markdown, "html": html}
 
 
+async def get_page_speed(state: State) -> dict:
+    # Запрос к PageSpeed не зависит от разметки страницы и выполняется
+    # параллельно с её загрузкой
+    try:
+        page_speed = await run_page_speed(state["url"])
+    except (aiohttp.ClientError, TimeoutError):
+        # Узел SEO повторит запрос, если отчёт не получен заранее
+        logger.warning("Не удалось получить отчёт PageSpeed для %s", state["url"])
+        page_speed = {}
+    return {"page_speed": page_speed}
+
+
 async def get_analyst_result(state: State) -> dict:
     result = await agent_analyst.ainvoke({"url": state["url"], "markdown": state["markdown"]})  # type: ignore  # noqa: PGH003
-    total_tokens = result["total_tokens"] + state.get("total_tokens", 0)
-    total_money = result["total_money"] + state.get("total_money", 0)
+    total_tokens = result["total_tokens"]
+    total_money = result["total_money"]
 
     del result["url"]
     del result["markdown"]
@@ -45,10 +68,11 @@ async def get_seo_result(state: State) -> dict:
             "url": state["url"],
             "markdown": state["markdown"],
             "html": state["html"],
+            "page_speed": state["page_speed"],
         }  # type: ignore  # noqa: PGH003
     )
-    total_tokens = result["total_tokens"] + state.get("total_tokens", 0)
-    total_money = result["total_money"] + state.get("total_money", 0)
+    total_tokens = result["total_tokens"]
+    total_money = result["total_money"]
     del result["total_tokens"]
     del result["total_money"]
     return {
@@ -62,8 +86,9 @@ async def get_content_generation_result(state: State) -> dict:
     result = await agent_content_generation.ainvoke(
         {"url": state["url"], "html": state["html"], "markdown": state["markdown"]}  # type: ignore  # noqa: PGH003
     )
-    total_tokens = result["total_tokens"] + state.get("total_tokens", 0)
-    total_money = result["total_money"] + state.get("total_money", 0)
+    total_tokens = result["total_tokens"]
+    total_money = result["total_money"]
+    cached_tokens = result.pop("cached_tokens", 0)
     del result["html"]
     del result["markdown"]
     del result["total_tokens"]
@@ -71,21 +96,24 @@ async def get_content_generation_result(state: State) -> dict:
     return {
         "content_generation_result": result,
         "total_tokens": total_tokens,
+        "cached_tokens": cached_tokens,
         "total_money": total_money,
     }
 
 
-builder = StateGraph(State)
+builder = StateGraph(State, output_schema=OutputState)
 
 builder.add_node("get_site_markups", get_site_markups)
+builder.add_node("get_page_speed", get_page_speed)
 builder.add_node("get_analyst_result", get_analyst_result)
 builder.add_node("get_seo_result", get_seo_result)
 builder.add_node("get_content_generation_result", get_content_generation_result)
 
 builder.add_edge(START, "get_site_markups")
+builder.add_edge(START, "get_page_speed")
 
 builder.add_edge("get_site_markups", "get_analyst_result")
-builder.add_edge("get_site_markups", "get_seo_result")
+builder.add_edge(["get_site_markups", "get_page_speed"], "get_seo_result")
 builder.add_edge("get_site_markups", "get_content_generation_result")
 
 builder.add_edge("get_analyst_result", END)
@@ -1,6 +1,8 @@
+import asyncio
 import json
+import logging
 from datetime import UTC, datetime
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, status
 from pydantic import HttpUrl
@@ -13,9 +15,41 @@ from ...database.repository import UserSEORepository
 from ...schemas import SEOResult
 from ..dependencies import CurrentUserDep, get_repo
 
+logger = logging.getLogger(__name__)
+
 router_seo = APIRouter()
 
 
+async def _save_result(
+    repository: UserSEORepository, user_id: UUID, generation_id: str, text: str, result: dict
+) -> None:
+    """Сохраняет результат анализа в БД и индексирует его в RAG одновременно.
+
+    Сохранение в БД обязательно: при его ошибке проиндексированные чанки удаляются,
+    чтобы в RAG не оставалось записей без строки в БД. Индексация выполняется
+    по возможности, её ошибка только логируется.
+    """
+    schema = SEOResult(user_id=user_id, result=result)  # type: ignore  # noqa: PGH003
+    indexed, created = await asyncio.gather(
+        rag.indexing(
+            text=text,
+            metadata={
+                "tenant_id": str(user_id),
+                "timestamp": int(datetime.now(UTC).timestamp()),
+                "generation_id": generation_id,
+            },
+        ),
+        repository.create(entity=schema),
+        return_exceptions=True,
+    )
+    if isinstance(indexed, BaseException):
+        logger.error("Не удалось проиндексировать результат %s", generation_id, exc_info=indexed)
+    if isinstance(created, BaseException):
+        if not isinstance(indexed, BaseException):
+            rag.delete_documents(indexed)
+        raise created
+
+
 @router_seo.get("/seo", status_code=status.HTTP_200_OK)
 async def get_seo(
     url: HttpUrl,
@@ -28,18 +62,9 @@ async def get_seo(
     del result["markdown"]
 
     generation_id = str(uuid4())
-    await rag.indexing(
-        text=json.dumps(result),
-        metadata={
-            "tenant_id": str(current_user.user_id),
-            "timestamp": int(datetime.now(UTC).timestamp()),
-            "generation_id": generation_id,
-        },
-    )
-
+    text = json.dumps(result)
     result["generation_id"] = generation_id
-    schema = SEOResult(user_id=current_user.user_id, result=result)  # type: ignore  # noqa: PGH003
-    await repository.create(entity=schema)
+    await _save_result(repository, current_user.user_id, generation_id, text, result)
     return result
 
 
@@ -57,16 +82,7 @@ async def get_aio(
     )  # type: ignore  # noqa: PGH003
     del result["html"]
     del result["markdown"]
-    await rag.indexing(
-        text=json.dumps(result),
-        metadata={
-            "tenant_id": str(current_user.user_id),
-            "timestamp": int(datetime.now(UTC).timestamp()),
-            "generation_id": generation_id,
-        },
-    )
-
+    text = json.dumps(result)
     result["generation_id"] = generation_id
-    schema = SEOResult(user_id=current_user.user_id, result=result)  # type: ignore  # noqa: PGH003
-    await repository.create(entity=schema)
+    await _save_result(repository, current_user.user_id, generation_id, text, result)
     return result
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from langchain.messages import AIMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_openai import ChatOpenAI
+
+LLM_CACHE_SIZE = 1024
+LLM_CACHE_TTL = 60 * 60 * 24
+
+
+class TTLCache[K, V]:
+    """LRU кэш в памяти процесса с ограниченным временем жизни записей.
+
+    Доступ защищён блокировкой, так как кэш используется и из рабочих потоков (asyncio.to_thread).
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class SingleFlightCache[V]:
+    """TTL кэш результатов асинхронных вызовов с объединением одновременных запросов.
+
+    Пока значение для ключа загружается, остальные вызовы с тем же ключом
+    ожидают ту же задачу, а не выполняют запрос повторно.
+    Ошибки загрузки не кэшируются, пустые значения кэшируются только при cache_empty.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, cache_empty: bool = True) -> None:
+        self._cache: TTLCache[str, V] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._cache_empty = cache_empty
+        self._inflight: dict[str, asyncio.Task[V]] = {}
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[V]]) -> V:
+        """Получает значение из кэша или загружает его.
+
+        :param key: Ключ кэша.
+        :param fetch: Фабрика корутины, загружающей значение.
+        :return Значение для ключа.
+        """
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+
+            async def run() -> V:
+                return await fetch()
+
+            task = asyncio.create_task(run())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Отмена одного из ожидающих не должна отменять общую загрузку
+        value = await asyncio.shield(task)
+        if value or self._cache_empty:
+            self._cache.set(key, value)
+        return value
+
+
+_llm_cache: TTLCache[str, AIMessage] = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+
+
+def without_usage(message: AIMessage) -> AIMessage:
+    """Копия закэшированного ответа с обнулённым расходом токенов"""
+    return message.model_copy(
+        update={"usage_metadata": UsageMetadata(input_tokens=0, output_tokens=0, total_tokens=0)}
+    )
+
+
+def _make_key(llm: ChatOpenAI, request: str) -> str:
+    return hashlib.blake2b(f"{llm.model_name}\n{request}".encode(), digest_size=32).hexdigest()
+
+
+async def cached_invoke(llm: ChatOpenAI, request: str) -> AIMessage:
+    """Вызов LLM с кэшированием ответа по содержимому запроса.
+
+    Подходит только для детерминированных по смыслу запросов (анализ файлов, суммаризация).
+    При попадании в кэш токены не расходуются, поэтому usage ответа обнуляется.
+
+    :param llm: Модель, которой отправляется запрос.
+    :param request: Текст запроса.
+    :return Ответ модели.
+    """
+    key = _make_key(llm, request)
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        return without_usage(cached)
+    result: AIMessage = await llm.ainvoke(request)  # type: ignore  # noqa: PGH003
+    _llm_cache.set(key, result)
+    return result
@@ -3,4 +3,5 @@ import aiohttp
 STATUS_OK = 200
 BATCH_SIZE = 3
 REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+SUMMARIZE_CONCURRENCY = 5
 ALLOWED_EXT = {".png", ".jpg", ".jpeg", ".webp"}
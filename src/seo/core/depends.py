@@ -1,15 +1,16 @@
 from typing import Final
 
+import openai
 from langchain.agents.middleware import SummarizationMiddleware
+from langchain_core.exceptions import OutputParserException
 from langchain_core.language_models import ModelProfile
 from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import Generation
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
-from langchain_text_splitters import (
-    RecursiveCharacterTextSplitter,
-    TextSplitter,
-)
-from pydantic import SecretStr
+from langchain_text_splitters import TextSplitter
+from pydantic import BaseModel, SecretStr, ValidationError
 
 from ...settings import settings
 from ..agents.prompts import PROMPT_CWV, PROMPT_MARKDOWN, PROMPT_RESULT, PROMPT_SUMMARIZE_CHAT
@@ -23,16 +24,13 @@ from ..schemas import (
     SiteAnalysisReport,
     SpecializationSite,
 )
+from ..utils.splitter import FastTextSplitter
 
 CHUNK_SIZE = 1500
 CHUNK_OVERLAP = 50
 TIMEOUT = 120
 MININUM_COSINE_SIMILARITY = 0.45
 
-CHUNK_SIZE = 1500
-CHUNK_OVERLAP = 50
-
-
 yandex_gpt: ChatOpenAI = ChatOpenAI(
     api_key=SecretStr(settings.yandexcloud.api_key),
     model=f"gpt://{settings.yandexcloud.folder_id}/yandexgpt/latest",
@@ -55,11 +53,10 @@ gemma_3_27b_it: ChatOpenAI = ChatOpenAI(
     max_retries=3,
 )
 
-text_splitter: Final[TextSplitter] = RecursiveCharacterTextSplitter(
+text_splitter: Final[TextSplitter] = FastTextSplitter(
     chunk_size=CHUNK_SIZE,
     chunk_overlap=CHUNK_OVERLAP,
-    length_function=len,
-    separators=["\n\n", "\n", " ", ""],
+    separators=("\n\n", "\n", " "),
 )
 
 summarization_middleware = SummarizationMiddleware(
@@ -70,38 +67,77 @@ summarization_middleware = SummarizationMiddleware(
 )
 
 
-parser_markdown = PydanticOutputParser(pydantic_object=SEOAnalysisReport)
+class FastPydanticOutputParser(PydanticOutputParser):
+    """Парсер ответа модели с валидацией JSON за один проход.
 
-parser_specialization = PydanticOutputParser(pydantic_object=SpecializationSite)
+    Если модель вернула чистый JSON, он разбирается и валидируется сразу через
+    ``model_validate_json``, без промежуточного словаря. Ответы в markdown-блоках
+    и частичный вывод обрабатываются стандартным парсером.
+    """
 
-parser_expertise = PydanticOutputParser(pydantic_object=ExpertiseSite)
+    def parse_result(self, result: list[Generation], *, partial: bool = False) -> BaseModel | None:
+        if not partial:
+            try:
+                return self.pydantic_object.model_validate_json(result[0].text.strip())
+            except ValidationError:
+                pass
+        return super().parse_result(result, partial=partial)
 
-parser_aio_content = PydanticOutputParser(pydantic_object=GenerateAIOContent)
 
+def structured_chain(llm: ChatOpenAI, parser: PydanticOutputParser) -> Runnable:
+    """Цепочка со структурированным выводом модели по JSON-схеме парсера.
+
+    Если модель не поддерживает response_format или вернула невалидный ответ,
+    запрос повторяется с разбором текста парсером по инструкциям формата из промпта.
+    """
+    structured = llm.with_structured_output(parser.pydantic_object, method="json_schema")
+    return structured.with_fallbacks(
+        [llm | parser],
+        exceptions_to_handle=(OutputParserException, openai.BadRequestError, ValidationError),
+    )
 
-markdown_prompt_template: PromptTemplate = PromptTemplate(
-    template=PROMPT_MARKDOWN,
-    input_variables=["query"],
-    partial_variables={"format_instructions": parser_markdown.get_format_instructions()},
-)
 
+parser_markdown = FastPydanticOutputParser(pydantic_object=SEOAnalysisReport)
 
-parser_cwv = PydanticOutputParser(pydantic_object=CWVReport)
+parser_specialization = FastPydanticOutputParser(pydantic_object=SpecializationSite)
 
-parser_result = PydanticOutputParser(pydantic_object=SiteAnalysisReport)
+parser_expertise = FastPydanticOutputParser(pydantic_object=ExpertiseSite)
 
-parser_sc = PydanticOutputParser(pydantic_object=SemanticCore)
+parser_aio_content = FastPydanticOutputParser(pydantic_object=GenerateAIOContent)
 
-parser_generated_alt = PydanticOutputParser(pydantic_object=ListGeneratedAlt)
+parser_cwv = FastPydanticOutputParser(pydantic_object=CWVReport)
+
+parser_result = FastPydanticOutputParser(pydantic_object=SiteAnalysisReport)
+
+parser_sc = FastPydanticOutputParser(pydantic_object=SemanticCore)
+
+parser_generated_alt = FastPydanticOutputParser(pydantic_object=ListGeneratedAlt)
+
+# Инструкции формата зависят только от схемы и строятся один раз на процесс
+markdown_format_instructions: Final[str] = parser_markdown.get_format_instructions()
+specialization_format_instructions: Final[str] = parser_specialization.get_format_instructions()
+expertise_format_instructions: Final[str] = parser_expertise.get_format_instructions()
+aio_content_format_instructions: Final[str] = parser_aio_content.get_format_instructions()
+cwv_format_instructions: Final[str] = parser_cwv.get_format_instructions()
+result_format_instructions: Final[str] = parser_result.get_format_instructions()
+sc_format_instructions: Final[str] = parser_sc.get_format_instructions()
+generated_alt_format_instructions: Final[str] = parser_generated_alt.get_format_instructions()
+
+
+markdown_prompt_template: PromptTemplate = PromptTemplate(
+    template=PROMPT_MARKDOWN,
+    input_variables=["query"],
+    partial_variables={"format_instructions": markdown_format_instructions},
+)
 
 cwv_prompt_template: PromptTemplate = PromptTemplate(
     template=PROMPT_CWV,
     input_variables=["query"],
-    partial_variables={"format_instructions": parser_cwv.get_format_instructions()},
+    partial_variables={"format_instructions": cwv_format_instructions},
 )
 
 result_prompt_template: PromptTemplate = PromptTemplate(
     template=PROMPT_RESULT,
     input_variables=["sitemap", "markdown", "seo_issue", "cwv"],
-    partial_variables={"format_instructions": parser_result.get_format_instructions()},
+    partial_variables={"format_instructions": result_format_instructions},
 )
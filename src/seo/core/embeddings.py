@@ -0,0 +1,6 @@
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = "deepvk/USER-bge-m3"
+
+# Модель эмбеддингов загружается один раз на процесс и используется RAG и семантическим кэшем
+hf_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
@@ -0,0 +1,42 @@
+import asyncio
+
+import aiohttp
+
+from .constants import REQUEST_TIMEOUT
+
+CONNECTIONS_LIMIT = 100
+DNS_CACHE_TTL = 300
+
+
+class HTTPSession:
+    """Общая HTTP сессия aiohttp для внешних запросов.
+
+    Сессия создаётся при первом обращении и переиспользует соединения
+    (keep-alive, кэш DNS) между запросами к одним и тем же хостам.
+    """
+
+    def __init__(self) -> None:
+        self._session: aiohttp.ClientSession | None = None
+        self._lock = asyncio.Lock()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Получает открытую сессию, создавая её при необходимости"""
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=CONNECTIONS_LIMIT, ttl_dns_cache=DNS_CACHE_TTL
+                    ),
+                    timeout=REQUEST_TIMEOUT,
+                )
+            return self._session
+
+    async def close(self) -> None:
+        """Закрывает сессию и все её соединения"""
+        async with self._lock:
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+
+http_session = HTTPSession()
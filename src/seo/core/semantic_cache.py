@@ -0,0 +1,122 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+from langchain.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+from .cache import cached_invoke, without_usage
+from .embeddings import hf_model
+
+SEMANTIC_CACHE_SIZE = 1024
+SEMANTIC_CACHE_TTL = 60 * 5
+# Порог косинусной близости, при котором содержимое считается тем же самым.
+# Ответ переиспользуется для другой версии содержимого, поэтому порог должен быть высоким
+SEMANTIC_CACHE_THRESHOLD = 0.97
+# Почти одинаковое содержимое обновляет существующую запись вместо добавления новой
+SEMANTIC_CACHE_DUPLICATE_THRESHOLD = 0.99
+
+
+class SemanticCache:
+    """Кэш ответов LLM по близости эмбеддингов содержимого запроса.
+
+    Эмбеддинги хранятся нормализованными в одной матрице, поэтому поиск
+    ближайшей записи сводится к одному матричному умножению.
+    """
+
+    def __init__(self, maxsize: int = SEMANTIC_CACHE_SIZE, ttl: float = SEMANTIC_CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._embeddings: np.ndarray | None = None
+        self._answers: list[AIMessage] = []
+        self._expires_at: list[float] = []
+        self._last_used: list[float] = []
+
+    def _nearest(self, embedding: np.ndarray) -> tuple[int, float]:
+        if self._embeddings is None or not self._answers:
+            return -1, 0.0
+        similarities = self._embeddings @ embedding
+        index = int(np.argmax(similarities))
+        return index, float(similarities[index])
+
+    def _remove(self, index: int) -> None:
+        self._embeddings = np.delete(self._embeddings, index, axis=0)  # type: ignore  # noqa: PGH003
+        del self._answers[index]
+        del self._expires_at[index]
+        del self._last_used[index]
+
+    def _remove_expired(self) -> None:
+        now = time.monotonic()
+        for index in reversed(range(len(self._expires_at))):
+            if self._expires_at[index] < now:
+                self._remove(index)
+
+    def get(self, embedding: np.ndarray, tau: float = SEMANTIC_CACHE_THRESHOLD) -> AIMessage | None:
+        """Ищет ответ для содержимого с близким эмбеддингом.
+
+        :param embedding: Нормализованный эмбеддинг содержимого.
+        :param tau: Минимальная косинусная близость для попадания в кэш.
+        :return Закэшированный ответ или None.
+        """
+        self._remove_expired()
+        index, similarity = self._nearest(embedding)
+        if index < 0 or similarity < tau:
+            return None
+        self._last_used[index] = time.monotonic()
+        return self._answers[index]
+
+    def put(self, embedding: np.ndarray, answer: AIMessage) -> None:
+        """Сохраняет ответ, вытесняя давно неиспользуемые записи при переполнении.
+
+        :param embedding: Нормализованный эмбеддинг содержимого.
+        :param answer: Ответ модели.
+        """
+        now = time.monotonic()
+        index, similarity = self._nearest(embedding)
+        if index >= 0 and similarity >= SEMANTIC_CACHE_DUPLICATE_THRESHOLD:
+            self._answers[index] = answer
+            self._expires_at[index] = now + self.ttl
+            self._last_used[index] = now
+            return
+        if len(self._answers) >= self.maxsize:
+            self._remove(self._last_used.index(min(self._last_used)))
+        row = embedding.reshape(1, -1)
+        self._embeddings = row if self._embeddings is None else np.vstack([self._embeddings, row])
+        self._answers.append(answer)
+        self._expires_at.append(now + self.ttl)
+        self._last_used.append(now)
+
+
+_caches: dict[str, SemanticCache] = {}
+
+
+def _embed(content: str) -> np.ndarray:
+    return hf_model.encode_document(content, normalize_embeddings=True).astype(np.float32)  # type: ignore  # noqa: PGH003
+
+
+async def semantic_cached_invoke(
+    llm: ChatOpenAI, request: str, content: str, namespace: str, site_url: str
+) -> AIMessage:
+    """Вызов LLM с переиспользованием ответа для почти идентичного содержимого.
+
+    Близость сравнивается только по подставляемому в промпт содержимому,
+    только внутри одного типа запросов и только для одного сайта: ответы
+    содержат адреса и пути сайта и не должны попадать другим пользователям.
+
+    :param llm: Модель, которой отправляется запрос.
+    :param request: Полный текст запроса.
+    :param content: Содержимое, по которому сравниваются запросы.
+    :param namespace: Тип запроса, например имя промпта.
+    :param site_url: URL адрес анализируемого сайта.
+    :return Ответ модели.
+    """
+    domain = urlparse(site_url).netloc.lower()
+    cache = _caches.setdefault(f"{llm.model_name}:{namespace}:{domain}", SemanticCache())
+    embedding = await asyncio.to_thread(_embed, content)
+    cached = cache.get(embedding)
+    if cached is not None:
+        return without_usage(cached)
+    result = await cached_invoke(llm, request)
+    cache.put(embedding, result)
+    return result
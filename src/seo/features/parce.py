@@ -96,7 +96,7 @@ async def get_links(url: str) -> list:
         )
         try:
             html = await get_html_content(browser, url)
-            soup = BeautifulSoup(html, "html.parser")
+            soup = BeautifulSoup(html, "lxml")
             all_links = soup.find_all("a")
             links: list = []
             for href in all_links:
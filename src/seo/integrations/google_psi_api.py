@@ -1,77 +1,97 @@
 from typing import Any
 
 import aiohttp
+import orjson
 
 from ...settings import settings
+from ..core.cache import SingleFlightCache
+from ..core.http import http_session
 
 BASE_URL = "https://www.googleapis.com"
+# Lighthouse анализ страницы может выполняться дольше обычных запросов
+PSI_TIMEOUT = aiohttp.ClientTimeout(total=120)
+# Поля ответа PSI, которые передаются в анализ
+_PICK: tuple[str, ...] = ("loadingExperience", "originLoadingExperience")
+_LIGHTHOUSE_PICK: tuple[str, ...] = (
+    "requestedUrl",
+    "finalUrl",
+    "lighthouseVersion",
+    "configSettings",
+)
+_CATEGORIES_PICK: tuple[str, ...] = ("performance", "seo")
+PSI_CACHE_SIZE = 256
+PSI_CACHE_TTL = 60 * 5
+# Аудиты Lighthouse, относящиеся к Core Web Vitals
+_CWV_AUDITS: frozenset[str] = frozenset(
+    {
+        "largest-contentful-paint",
+        "cumulative-layout-shift",
+        "first-contentful-paint",
+        "first-input-delay",
+        "interaction-to-next-paint",
+        "total-blocking-time",
+        "time-to-first-byte",
+    }
+)
 
 
-async def run_page_speed(url: str):
-    async with (
-        aiohttp.ClientSession(base_url=settings.google.base_url) as session,
-        session.get(
-            url="/pagespeedonline/v5/runPagespeed",
-            params={
-                "url": url,
-                "strategy": "mobile",
-                "category": ["seo", "performance", "best-practices"],
-                "key": settings.google.psi_api_key,
-            },
-        ) as response,
-    ):
-        data = await response.json()
+# Пустой отчёт не кэшируется, чтобы разовый сбой не скрывал данные CWV на время TTL
+_psi_cache: SingleFlightCache[dict[str, Any]] = SingleFlightCache(
+    maxsize=PSI_CACHE_SIZE, ttl=PSI_CACHE_TTL, cache_empty=False
+)
+
+
+async def run_page_speed(url: str) -> dict[str, Any]:
+    """Получает отчёт PageSpeed Insights для страницы.
+
+    Отчёт кэшируется по полному URL страницы, одновременные запросы
+    одной и той же страницы выполняются одним обращением к API.
+    """
+    return await _psi_cache.get_or_fetch(url, lambda: _fetch_page_speed(url))
+
+
+async def _fetch_page_speed(url: str) -> dict[str, Any]:
+    session = await http_session.get_session()
+    async with session.get(
+        url=f"{settings.google.base_url}/pagespeedonline/v5/runPagespeed",
+        params={
+            "url": url,
+            "strategy": "mobile",
+            "category": ["seo", "performance", "best-practices"],
+            "key": settings.google.psi_api_key,
+        },
+        timeout=PSI_TIMEOUT,
+    ) as response:
+        response.raise_for_status()
+        data = orjson.loads(await response.read())
 
     return _parse_response(data)
 
 
-def _parse_response(response: dict[str, Any]) -> dict[str, Any]:  # noqa: C901
-    filtered = {}
-    if "loadingExperience" in response:
-        filtered["loadingExperience"] = response["loadingExperience"]
-    if "originLoadingExperience" in response:
-        filtered["originLoadingExperience"] = response["originLoadingExperience"]
-    if "lighthouseResult" in response:
-        lh = response["lighthouseResult"]
-        filtered_lh = {}
-        if "requestedUrl" in lh:
-            filtered_lh["requestedUrl"] = lh["requestedUrl"]
-        if "finalUrl" in lh:
-            filtered_lh["finalUrl"] = lh["finalUrl"]
-        if "lighthouseVersion" in lh:
-            filtered_lh["lighthouseVersion"] = lh["lighthouseVersion"]
-        if "configSettings" in lh:
-            filtered_lh["configSettings"] = lh["configSettings"]
-        if "categories" in lh:
-            categories = {}
-            if "performance" in lh["categories"]:
-                categories["performance"] = lh["categories"]["performance"]
-            if "seo" in lh["categories"]:
-                categories["seo"] = lh["categories"]["seo"]
-            if categories:
-                filtered_lh["categories"] = categories
-        if "audits" in lh:
-            audits = {}
-            cwv_audit_ids = [
-                "largest-contentful-paint",
-                "cumulative-layout-shift",
-                "first-contentful-paint",
-                "first-input-delay",
-                "interaction-to-next-paint",
-                "total-blocking-time",
-                "time-to-first-byte",
-            ]
-            seo_audit_ids = []
-            if "categories" in filtered_lh and "seo" in filtered_lh["categories"]:
-                seo_audit_ids = [
-                    ref["id"] for ref in filtered_lh["categories"]["seo"].get("auditRefs", [])
-                ]
-            relevant_ids = set(cwv_audit_ids + seo_audit_ids)
-            for audit_id in relevant_ids:
-                if audit_id in lh["audits"]:
-                    audits[audit_id] = lh["audits"][audit_id]
-            if audits:
-                filtered_lh["audits"] = audits
-        if filtered_lh:
-            filtered["lighthouseResult"] = filtered_lh
+def _pick(data: dict[str, Any], keys: tuple[str, ...]) -> dict[str, Any]:
+    return {key: data[key] for key in keys if key in data}
+
+
+def _parse_response(response: dict[str, Any]) -> dict[str, Any]:
+    filtered = _pick(response, _PICK)
+    lh = response.get("lighthouseResult")
+    if lh is None:
+        return filtered
+    filtered_lh = _pick(lh, _LIGHTHOUSE_PICK)
+    categories = _pick(lh.get("categories", {}), _CATEGORIES_PICK)
+    if categories:
+        filtered_lh["categories"] = categories
+    lh_audits = lh.get("audits")
+    if lh_audits is not None:
+        seo_audit_ids = frozenset(
+            ref["id"] for ref in categories.get("seo", {}).get("auditRefs", ())
+        )
+        # Нужных аудитов на порядок меньше, чем аудитов в ответе
+        audits = {
+            key: lh_audits[key] for key in sorted(_CWV_AUDITS | seo_audit_ids) if key in lh_audits
+        }
+        if audits:
+            filtered_lh["audits"] = audits
+    if filtered_lh:
+        filtered["lighthouseResult"] = filtered_lh
     return filtered
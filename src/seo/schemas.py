@@ -2,37 +2,47 @@ from datetime import datetime
 from enum import StrEnum
 from uuid import UUID
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
-class HeaderAnalysis(BaseModel):
+class LLMOutput(BaseModel):
+    """Базовая схема структурированного ответа модели.
+
+    Ответы только читаются и сериализуются, поэтому модели неизменяемые,
+    а лишние поля из ответа модели отбрасываются.
+    """
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+
+class HeaderAnalysis(LLMOutput):
     tag: str  # H1, H2, H3...
     text: str
     contains_keywords: bool
     issues: list[str] | None = []
 
 
-class KeywordAnalysis(BaseModel):
+class KeywordAnalysis(LLMOutput):
     keyword: str
     count: int
     density: float  # в процентах
 
 
-class LinkAnalysis(BaseModel):
+class LinkAnalysis(LLMOutput):
     url: str
     anchor_text: str
     is_internal: bool
     is_broken: bool | None = None
 
 
-class ImageAnalysis(BaseModel):
+class ImageAnalysis(LLMOutput):
     src: str
     alt_text: str | None
     has_keywords: bool
     issues: list[str] | None = []
 
 
-class ReadabilityAnalysis(BaseModel):
+class ReadabilityAnalysis(LLMOutput):
     word_count: int
     sentence_count: int
     paragraphs_count: int
@@ -40,13 +50,13 @@ class ReadabilityAnalysis(BaseModel):
     issues: list[str] | None = []
 
 
-class MetadataAnalysis(BaseModel):
+class MetadataAnalysis(LLMOutput):
     title: str | None
     description: str | None
     issues: list[str] | None = []
 
 
-class SEOAnalysisReport(BaseModel):
+class SEOAnalysisReport(LLMOutput):
     headers: list[HeaderAnalysis]
     keywords: list[KeywordAnalysis]
     links: list[LinkAnalysis]
@@ -57,7 +67,7 @@ class SEOAnalysisReport(BaseModel):
     recommendations: list[str]
 
 
-class CWVMetricSummary(BaseModel):
+class CWVMetricSummary(LLMOutput):
     category: str | None
     percentile: float | None
     fast_percent: float | None
@@ -79,7 +89,7 @@ class CWVMetricSummary(BaseModel):
         return v
 
 
-class CWVReport(BaseModel):
+class CWVReport(LLMOutput):
     overall_category: str | None
     performance_score: float | None
     seo_score: float | None
@@ -95,26 +105,26 @@ class CWVReport(BaseModel):
     recommendations: list[str]
 
 
-class GenerateAIOContent(BaseModel):
+class GenerateAIOContent(LLMOutput):
     transformed_content: str = Field(description="Преобразованный контент")
     placement_recommendation: str = Field(
         description="Рекомендация по размещению текста на странице"
     )
 
 
-class Problem(BaseModel):
+class Problem(LLMOutput):
     title: str = Field(..., description="Краткое название проблемы")
     description: str = Field(..., description="Понятное объяснение проблемы")
     severity: str = Field(..., description="Уровень критичности: low | medium | high | critical")
     recommendation: str = Field(..., description="Рекомендация по исправлению")
 
 
-class SEOScore(BaseModel):
+class SEOScore(LLMOutput):
     score: int = Field(..., ge=0, le=100, description="Оценка SEO от 0 до 100")
     summary: str = Field(..., description="Краткое пояснение оценки")
 
 
-class PerformanceScore(BaseModel):
+class PerformanceScore(LLMOutput):
     score: int = Field(..., ge=0, le=100, description="Оценка производительности от 0 до 100")
     lcp: float | None = Field(None, description="Largest Contentful Paint (сек)")
     fid: float | None = Field(None, description="First Input Delay (мс)")
@@ -122,7 +132,7 @@ class PerformanceScore(BaseModel):
     summary: str = Field(..., description="Краткое пояснение оценки производительности")
 
 
-class SiteAnalysisReport(BaseModel):
+class SiteAnalysisReport(LLMOutput):
     overall_summary: str = Field(..., description="Общее резюме состояния сайта")
     content_analysis: str = Field(..., description="Анализ markdown и HTML структуры")
     core_web_vitals_analysis: str = Field(..., description="Анализ Core Web Vitals простым языком")
@@ -144,17 +154,17 @@ class SiteAnalysisReport(BaseModel):
         }
 
 
-class SpecializationSite(BaseModel):
+class SpecializationSite(LLMOutput):
     specialization: str
 
 
-class ExpertiseSite(BaseModel):
+class ExpertiseSite(LLMOutput):
     main_area: str
     key_user_problem: str
     benefit_to_the_user: str
 
 
-class SemanticCore(BaseModel):
+class SemanticCore(LLMOutput):
     high_frequency: list[str] = Field(description="Высокочастотные запросы")
     medium_frequency: list[str] = Field(description="Среднечастотные запросы")
     low_frequency: list[str] = Field(description="Низкочастотные запросы")
@@ -180,12 +190,12 @@ class QueueData(BaseModel):
     result: list[dict]
 
 
-class GeneratedAlt(BaseModel):
+class GeneratedAlt(LLMOutput):
     alt: str = Field(description="Сгенерированный альт тег")
     url: str = Field(description="Ссылка для которой был сегенерирован альт тег")
 
 
-class ListGeneratedAlt(BaseModel):
+class ListGeneratedAlt(LLMOutput):
     result: list[GeneratedAlt]
 
 
@@ -1,34 +1,105 @@
+import hashlib
+from functools import lru_cache
 from urllib.parse import urlparse
 
-from aiohttp import ClientSession
+import aiohttp
+import lxml.html
+import orjson
 from extruct.jsonld import JsonLdExtractor  # type: ignore  # noqa: PGH003
+from lxml import etree
 
+from ..core.cache import SingleFlightCache, TTLCache
+from ..core.constants import STATUS_OK
+from ..core.http import http_session
 
+JSON_LD_CACHE_SIZE = 256
+JSON_LD_CACHE_TTL = 60 * 60
+SITE_FILES_CACHE_SIZE = 512
+SITE_FILES_CACHE_TTL = 60 * 10
+
+_JSON_LD_XPATH = etree.XPath('//script[@type="application/ld+json"]')
+
+_jsonld_extractor = JsonLdExtractor()
+_json_ld_cache: TTLCache[bytes, list] = TTLCache(maxsize=JSON_LD_CACHE_SIZE, ttl=JSON_LD_CACHE_TTL)
+_site_files_cache: SingleFlightCache[str] = SingleFlightCache(
+    maxsize=SITE_FILES_CACHE_SIZE, ttl=SITE_FILES_CACHE_TTL
+)
+
+
+@lru_cache(maxsize=4096)
 def parse_url(url: str) -> str:
     parsed = urlparse(url)
     return f"{parsed.scheme}://{parsed.netloc}"
 
 
+def _extract_json_ld(html: str) -> list | None:
+    """Извлекает JSON-LD блоки напрямую из тегов script.
+
+    :return Список объектов JSON-LD или None, если документ или один из блоков
+    не удалось разобрать и нужен полный разбор через extruct.
+    """
+    try:
+        tree = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+    return _extract_json_ld_items(tree)
+
+
+def _extract_json_ld_items(tree: etree._Element) -> list | None:
+    """Собирает JSON-LD объекты из разобранного документа так же, как extruct"""
+    items: list = []
+    for script in _JSON_LD_XPATH(tree):
+        try:
+            # Как и в extruct, берётся весь текст узла, а не только первый текстовый фрагмент
+            data = orjson.loads(str(script.xpath("string()")))
+        except orjson.JSONDecodeError:
+            return None
+        # extruct учитывает только списки и объекты верхнего уровня и отбрасывает пустые элементы
+        if isinstance(data, list):
+            items.extend(data)
+        elif isinstance(data, dict):
+            items.append(data)
+    return [item for item in items if item]
+
+
 def get_json_ld(html: str) -> list:
-    jslde = JsonLdExtractor()
-    return jslde.extract(html)
+    """Извлекает JSON-LD разметку из HTML, кэшируя результат по хэшу документа"""
+    key = hashlib.blake2b(html.encode(), digest_size=16).digest()
+    json_ld = _json_ld_cache.get(key)
+    if json_ld is None:
+        json_ld = _extract_json_ld(html)
+        if json_ld is None:
+            json_ld = _jsonld_extractor.extract(html)
+        _json_ld_cache.set(key, json_ld)
+    return list(json_ld)
+
+
+async def _fetch_site_file(url: str, filename: str) -> str:
+    """Загружает служебный текстовый файл из корня сайта с кэшированием по адресу файла.
+
+    :param url: URL любой страницы сайта.
+    :param filename: Имя файла в корне сайта.
+    :return Содержимое файла или пустая строка, если файла нет.
+    """
+    file_url = f"{parse_url(url)}/{filename}"
+    return await _site_files_cache.get_or_fetch(file_url, lambda: _download_site_file(file_url))
+
+
+async def _download_site_file(file_url: str) -> str:
+    session = await http_session.get_session()
+    try:
+        async with session.get(file_url, ssl=False) as response:
+            # Сайты без файла часто отдают HTML страницу 404 или главную
+            if response.status != STATUS_OK or response.content_type == "text/html":
+                return ""
+            return await response.text()
+    except (aiohttp.ClientError, TimeoutError, UnicodeDecodeError):
+        return ""
 
 
 async def get_llms_data(url: str) -> str:
-    url = parse_url(url)
-    async with ClientSession() as session, session.get(f"{url}/llms.txt", ssl=False) as data:
-        try:
-            result = await data.text()
-            return result if "html" not in result else ""  # noqa: TRY300
-        except:  # noqa: E722
-            return ""
+    return await _fetch_site_file(url, "llms.txt")
 
 
 async def get_robots_data(url: str) -> str:
-    url = parse_url(url)
-    async with ClientSession() as session, session.get(f"{url}/robots.txt", ssl=False) as data:
-        try:
-            result = await data.text()
-            return result if "html" not in result else ""  # noqa: TRY300
-        except:  # noqa: E722
-            return ""
+    return await _fetch_site_file(url, "robots.txt")
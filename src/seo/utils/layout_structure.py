@@ -1,14 +1,29 @@
+import logging
 import re
 from enum import StrEnum
+from functools import lru_cache
 
-from bs4 import BeautifulSoup
+import lxml.html
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
 from pydantic import BaseModel
 
 OPTIMAL_TITLE_LENGTH = 55
 OPTIMAL_TITLE_DELTA = 10
 MAX_DESCRIPTION_LENGTH = 160
 MIN_DESCRIPTION_LENGTH = 120
-SEMANTIC_TAGS = {"header", "nav", "main", "article", "section", "aside", "footer"}
+SEMANTIC_TAGS = frozenset({"header", "nav", "main", "article", "section", "aside", "footer"})
+# Парсер, на котором обход дерева в валидаторах работает быстрее всего
+PREFERRED_PARSER = "lxml"
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+HEADING_TAGS = HEADING_LEVELS.keys()
+# Адреса длиннее порога (встроенные data: изображения) не кэшируются, чтобы не удерживать их в памяти
+MAX_CACHED_IMAGE_SRC_LENGTH = 2048
+# Признаки безымянного файла изображения: служебное слово в пути без расширения
+_IMG_KEYWORD_RE = re.compile(r"image|img|picture", re.IGNORECASE)
+_IMG_EXT_RE = re.compile(r"\.(?:jpe?g|png|webp)", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
 
 
 class IssueLevel(StrEnum):
@@ -19,36 +34,98 @@ class IssueLevel(StrEnum):
 
 
 class Issue(BaseModel):
+    """Замечание по разметке.
+
+    Поля заполняются только самими валидаторами, поэтому замечания создаются
+    через model_construct без повторной валидации.
+    """
+
     level: IssueLevel
     message: str
     category: str
     element: str
 
 
-def validate_title(soup: BeautifulSoup) -> list[Issue]:
-    title_tag = soup.find("title")
-    if title_tag is None:
-        return [
-            Issue(
-                level=IssueLevel.WARNING,
-                message="Title tag is missing",
-                category="meta",
-                element="title",
-            )
-        ]
-    if title_tag.text is None:  # type: ignore  # noqa: PGH003
+# Корзина, в которую попадает тег при обходе дерева
+_TAG_BUCKETS: dict[str, str] = {
+    "title": "title",
+    "img": "img",
+    **dict.fromkeys(HEADING_TAGS, "headings"),
+    **dict.fromkeys(SEMANTIC_TAGS, "semantic"),
+}
+
+
+# Теги, которые lxml отбирает при обходе дерева на стороне C
+_LXML_TAGS: tuple[str, ...] = ("meta", *_TAG_BUCKETS)
+
+
+def _empty_tags() -> dict[str, list]:
+    return {"title": [], "meta_description": [], "headings": [], "semantic": [], "img": []}
+
+
+def _add_tag(tags: dict[str, list], name: str, element: Tag | lxml.html.HtmlElement) -> None:
+    """Раскладывает тег по корзинам в виде, не зависящем от парсера:
+    текст title, content описания, имена заголовков и семантических тегов,
+    пары (alt, src) изображений.
+    """
+    if name == "meta":
+        # Валидатор проверяет только первый meta description, остальные
+        # meta теги не сравниваются по атрибутам
+        if not tags["meta_description"] and element.get("name") == "description":
+            tags["meta_description"].append(element.get("content", ""))
+        return
+    bucket = _TAG_BUCKETS.get(name)
+    if bucket == "title":
+        text = element.get_text() if isinstance(element, Tag) else element.text_content()
+        tags["title"].append(text)
+    elif bucket == "img":
+        tags["img"].append((element.get("alt", ""), element.get("src", "")))
+    elif bucket is not None:
+        tags[bucket].append(name)
+
+
+def _collect_tags(soup: BeautifulSoup) -> dict[str, list]:
+    """Собирает данные тегов, нужные валидаторам, за один обход дерева bs4.
+
+    Данные в каждой корзине идут в порядке документа.
+    """
+    tags = _empty_tags()
+    for element in soup.descendants:
+        if isinstance(element, Tag):
+            _add_tag(tags, element.name, element)
+    return tags
+
+
+def collect_tags_from_html(html: str) -> dict[str, list]:
+    """Собирает данные тегов напрямую через lxml, без построения дерева bs4"""
+    tags = _empty_tags()
+    try:
+        try:
+            root = lxml.html.document_fromstring(html)
+        except ValueError:
+            # Строки с объявлением кодировки lxml разбирает только в виде байтов
+            root = lxml.html.document_fromstring(html.encode())
+    except etree.ParserError:
+        return tags
+    for element in root.iter(*_LXML_TAGS):
+        _add_tag(tags, element.tag, element)
+    return tags
+
+
+def validate_title(tags: dict[str, list]) -> list[Issue]:
+    if not tags["title"]:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message="Title tag is missing",
                 category="meta",
                 element="title",
             )
         ]
-    title = title_tag.get_text().strip()  # type: ignore  # noqa: PGH003
+    title = tags["title"][0].strip()
     if not title:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message="Title tag is empty",
                 category="meta",
@@ -57,7 +134,7 @@ def validate_title(soup: BeautifulSoup) -> list[Issue]:
         ]
     if len(title) < OPTIMAL_TITLE_LENGTH - OPTIMAL_TITLE_DELTA:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"""Title is too short ({len(title)} characters)!
             Optimal length must be from {OPTIMAL_TITLE_LENGTH - OPTIMAL_TITLE_DELTA}
@@ -68,7 +145,7 @@ def validate_title(soup: BeautifulSoup) -> list[Issue]:
         ]
     if len(title) > OPTIMAL_TITLE_LENGTH + OPTIMAL_TITLE_DELTA:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"""Title is too long ({len(title)} characters)!
             Optimal length must be from {OPTIMAL_TITLE_LENGTH - OPTIMAL_TITLE_DELTA}
@@ -80,21 +157,20 @@ def validate_title(soup: BeautifulSoup) -> list[Issue]:
     return []
 
 
-def validate_description(soup: BeautifulSoup) -> list[Issue]:
-    description_element = soup.find("meta", attrs={"name": "description"})
-    if not description_element:
+def validate_description(tags: dict[str, list]) -> list[Issue]:
+    if not tags["meta_description"]:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message="Meta description is missing",
                 category="meta",
                 element="description",
             )
         ]
-    description = description_element.get("content", "").strip()  # type: ignore  # noqa: PGH003
+    description = tags["meta_description"][0].strip()
     if not description:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message="Meta description is empty",
                 category="meta",
@@ -103,7 +179,7 @@ def validate_description(soup: BeautifulSoup) -> list[Issue]:
         ]
     if len(description) > MAX_DESCRIPTION_LENGTH:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"Meta description too long ({len(description)} characters)! "
                 f"Recommended length should be from {MIN_DESCRIPTION_LENGTH} "
@@ -114,7 +190,7 @@ def validate_description(soup: BeautifulSoup) -> list[Issue]:
         ]
     if len(description) < MIN_DESCRIPTION_LENGTH:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"Meta description too short ({len(description)} characters)! "
                 f"Recommended length should be from {MIN_DESCRIPTION_LENGTH} "
@@ -126,12 +202,13 @@ def validate_description(soup: BeautifulSoup) -> list[Issue]:
     return []
 
 
-def validate_heading(soup: BeautifulSoup) -> list[Issue]:
+def validate_heading(tags: dict[str, list]) -> list[Issue]:
     issues = []
-    h1_tags = soup.find_all("h1")
+    headings = tags["headings"]
+    h1_tags = [heading for heading in headings if heading == "h1"]
     if len(h1_tags) == 0:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message="H1 tag is missing",
                 category="heading",
@@ -140,43 +217,37 @@ def validate_heading(soup: BeautifulSoup) -> list[Issue]:
         )
     elif len(h1_tags) > 1:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"Found {len(h1_tags)} H1 tags. Only one H1 per page is recommended",
                 category="heading",
                 element="h1",
             )
         )
-    headings = soup.find_all(re.compile(r"^h[1-6]$"))
     last_level = 0
     for heading in headings:
-        level = int(heading.name[1])
+        level = HEADING_LEVELS[heading]
         if level > last_level + 1:
             issues.append(
-                Issue(
+                Issue.model_construct(
                     level=IssueLevel.WARNING,
                     message=f"The heading hierarchy is broken: H{level} after H{last_level}",
                     category="heading",
-                    element=heading.name,
+                    element=heading,
                 )
             )
         last_level = level
     return issues
 
 
-def validate_semantic_tags(soup: BeautifulSoup) -> list[Issue]:
+def validate_semantic_tags(tags: dict[str, list]) -> list[Issue]:
     issues = []
-    used_semantic_tags = []
-    unused_semantic_tags = []
-    for semantic_tag in SEMANTIC_TAGS:
-        elements = soup.find_all(semantic_tag)
-        if not elements:
-            unused_semantic_tags.append(semantic_tag)
-        else:
-            used_semantic_tags.append(semantic_tag)
+    found = set(tags["semantic"])
+    used_semantic_tags = sorted(found & SEMANTIC_TAGS)
+    unused_semantic_tags = sorted(SEMANTIC_TAGS - found)
     if unused_semantic_tags:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.INFO,
                 message=f"Unused semantic tags: {', '.join(unused_semantic_tags)}",
                 category="semantic tags",
@@ -185,7 +256,7 @@ def validate_semantic_tags(soup: BeautifulSoup) -> list[Issue]:
         )
     if used_semantic_tags:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.INFO,
                 message=f"Used semantic tags: {', '.join(used_semantic_tags)}",
                 category="semantic tags",
@@ -195,14 +266,31 @@ def validate_semantic_tags(soup: BeautifulSoup) -> list[Issue]:
     return issues
 
 
-def validate_images(soup: BeautifulSoup) -> list[Issue] | tuple:
+def _check_nameless_image(src: str) -> bool:
+    return bool(_IMG_KEYWORD_RE.search(src)) and not _IMG_EXT_RE.search(src)
+
+
+_cached_check_nameless_image = lru_cache(maxsize=4096)(_check_nameless_image)
+
+
+def _is_nameless_image(src: str) -> bool:
+    """Проверка, что по адресу изображения не понятно его содержимое.
+    Одни и те же адреса (заглушки, спрайты, CDN) повторяются на страницах,
+    поэтому результат кэшируется, кроме встроенных data: изображений и очень длинных адресов.
+    """
+    if src.startswith("data:") or len(src) > MAX_CACHED_IMAGE_SRC_LENGTH:
+        return _check_nameless_image(src)
+    return _cached_check_nameless_image(src)
+
+
+def validate_images(tags: dict[str, list]) -> list[Issue] | tuple:
     """Проверка SEO оптимизации изображений"""
     urls: list = []
     issues: list[Issue] = []
-    images = soup.find_all("img")
+    images = tags["img"]
     if not images:
         return [
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.INFO,
                 message="Images not found in page",
                 category="image",
@@ -213,23 +301,19 @@ def validate_images(soup: BeautifulSoup) -> list[Issue] | tuple:
     images_without_alt = 0  # Количество изображений без атрибута alt
     images_without_description = 0  # Изображения без описания в названии файла
 
-    for image in images:
-        alt, src = image.get("alt", ""), image.get("src", "")
+    for alt, src in images:
 
         if not alt:
             images_without_alt += 1
             urls.append(src)
         else:
             images_with_alt += 1
-        if (src and any(type in src.lower() for type in ["image", "img", "picture"])) and not any(  # noqa: A001, PGH003, RUF100 # type: ignore
-            extension in src.lower()  # type: ignore  # noqa: PGH003
-            for extension in [".jpg", ".jpeg", ".png", ".webp"]  # type: ignore  # noqa: PGH003
-        ):
+        if src and _is_nameless_image(src):
             images_without_description += 1
     # Добавляем один лог для изображений без alt
     if images_without_alt > 0:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"Found {images_without_alt} images without 'alt' attribute",
                 category="image",
@@ -240,7 +324,7 @@ def validate_images(soup: BeautifulSoup) -> list[Issue] | tuple:
     # Добавляем лог для изображений с alt (опционально, для информации)
     if images_with_alt > 0:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.INFO,
                 message=f"Found {images_with_alt} images with 'alt' attribute",
                 category="image",
@@ -250,7 +334,7 @@ def validate_images(soup: BeautifulSoup) -> list[Issue] | tuple:
 
     if images_without_description > 0:
         issues.append(
-            Issue(
+            Issue.model_construct(
                 level=IssueLevel.WARNING,
                 message=f"Missing description in image files {images_without_description}!",
                 category="image",
@@ -263,14 +347,34 @@ def validate_images(soup: BeautifulSoup) -> list[Issue] | tuple:
 
 def find_seo_issues(soup: BeautifulSoup) -> list[Issue]:
     """Нахождение замечаний касаемо SEO оптимизации разметки страницы"""
+    if soup.builder.NAME != PREFERRED_PARSER:
+        logger.warning(
+            "Разметка разобрана парсером %s, обход дерева быстрее с %s",
+            soup.builder.NAME,
+            PREFERRED_PARSER,
+        )
+    return _validate(_collect_tags(soup))
+
+
+def _validate(tags: dict[str, list]) -> list[Issue]:
     issues = []
-    issues.extend(validate_title(soup))
-    issues.extend(validate_description(soup))
-    issues.extend(validate_heading(soup))
-    img_result = validate_images(soup)
+    issues.extend(validate_title(tags))
+    issues.extend(validate_description(tags))
+    issues.extend(validate_heading(tags))
+    img_result = validate_images(tags)
     if isinstance(img_result, tuple):
         issues.extend(img_result[0])
     else:
         issues.extend(img_result)
-    issues.extend(validate_semantic_tags(soup))
+    issues.extend(validate_semantic_tags(tags))
     return issues
+
+
+def parse_and_audit(html: str) -> list[Issue]:
+    """Разбор HTML и нахождение замечаний по SEO оптимизации разметки.
+
+    Дерево строится и обходится средствами lxml без bs4. lxml отпускает GIL
+    во время разбора, поэтому функцию выгодно запускать в потоках.
+    """
+    return _validate(collect_tags_from_html(html))
+
@@ -0,0 +1,60 @@
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_text_splitters import TextSplitter
+
+DEFAULT_SEPARATORS: tuple[str, ...] = ("\n\n", "\n", " ")
+
+
+class FastTextSplitter(TextSplitter):
+    """Разбиение текста на чанки за один проход без рекурсии.
+
+    Окно длиной chunk_size сдвигается по тексту, точка разреза ищется
+    с конца окна через str.rfind по разделителям в порядке приоритета.
+    Разрез ставится не ближе середины новой (после перекрытия) части окна:
+    если подходящего разделителя дальше нет, используется следующий по приоритету,
+    а при их отсутствии текст режется по границе окна.
+    """
+
+    def __init__(self, separators: Sequence[str] = DEFAULT_SEPARATORS, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._separators = tuple(separators)
+
+    def _find_cut(self, text: str, start: int, end: int) -> int:
+        # Чанк должен добавлять к перекрытию хотя бы половину нового окна,
+        # иначе разделитель сразу за перекрытием порождает чанки из нескольких новых символов
+        lower = start + (self._chunk_size + self._chunk_overlap) // 2 + 1
+        for separator in self._separators:
+            cut = text.rfind(separator, lower, end)
+            if cut != -1:
+                return cut
+        return end
+
+    def _next_start(self, text: str, end: int) -> int:
+        if not self._chunk_overlap:
+            return end
+        start = end - self._chunk_overlap
+        # Перекрытие начинается с целого слова
+        space = text.find(" ", start, end)
+        return start if space == -1 else space + 1
+
+    def split_text(self, text: str) -> list[str]:
+        """Разбивает текст на чанки не длиннее chunk_size символов.
+
+        :param text: Исходный текст.
+        :return Список чанков.
+        """
+        chunks: list[str] = []
+        length = len(text)
+        start = 0
+        while start < length:
+            end = min(start + self._chunk_size, length)
+            if end < length:
+                end = self._find_cut(text, start, end)
+            chunk = text[start:end].strip() if self._strip_whitespace else text[start:end]
+            if chunk:
+                chunks.append(chunk)
+            if end >= length:
+                break
+            start = self._next_start(text, end)
+        return chunks
@@ -2,13 +2,28 @@
 
 from __future__ import annotations
 
+import heapq
+import posixpath
+import threading
+from collections import deque
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from operator import itemgetter
 from urllib.parse import urlparse
 
-from pydantic import BaseModel, Field, HttpUrl, field_validator
 from usp.objects.page import SitemapPage
 from usp.tree import sitemap_tree_for_homepage
+from usp.web_client.abstract_client import (
+    AbstractWebClient,
+    AbstractWebClientResponse,
+    AbstractWebClientSuccessResponse,
+)
+from usp.web_client.requests_client import RequestsWebClient
+
+# Не больше размера пула соединений requests к одному хосту
+SITEMAP_FETCH_WORKERS = 10
 
 PRIORITY_KEYWORDS: tuple[str, ...] = (
     "product",
@@ -62,6 +77,7 @@ DENIED_EXTENSIONS: tuple[str, ...] = (
     ".json",
     ".xml",
 )
+_DENIED_EXTENSIONS_SET: frozenset[str] = frozenset(DENIED_EXTENSIONS)
 
 
 def parse_url_path(url: str) -> list[str]:
@@ -69,38 +85,68 @@ def parse_url_path(url: str) -> list[str]:
 
     Пример: "http://site.com/folder/page" -> ["folder", "page"]
     """
-    path = urlparse(url).path
+    _, separator, rest = url.partition("//")
+    if not separator:
+        path = urlparse(url).path
+    else:
+        # Адреса из sitemap абсолютные, поэтому путь выделяется без полного разбора URL
+        path = rest.partition("/")[2].partition("?")[0].partition("#")[0]
     return [segment for segment in path.strip("/").split("/") if segment]
 
 
-class TreeNode(BaseModel):
+def _parse_last_modified(value: datetime | str | None) -> datetime | None:
+    """Приводит дату изменения страницы из sitemap к datetime"""
+    if not value or value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except (ValueError, AttributeError):
+            return None
+    return value
+
+
+@dataclass(slots=True, eq=False)
+class TreeNode:
     """Узел дерева структуры страниц сайта"""
 
     name: str
-    url: HttpUrl
+    url: str
     priority: float | None = None
     last_modified: datetime | None = None
-    children: list[TreeNode] = Field(default_factory=list)
-
-    @field_validator("last_modified", mode="before")
-    @classmethod
-    def validate_last_modified(cls, value: str | None) -> datetime | None:
-        if not value or value is None:
-            return None
-        if isinstance(value, str):
-            try:
-                return datetime.fromisoformat(value)
-            except (ValueError, AttributeError):
-                return None
-        return value
+    children: list[TreeNode] = field(default_factory=list)
+    # Индекс дочерних узлов по имени для поиска при построении дерева
+    _children_by_name: dict[str, TreeNode] = field(default_factory=dict, repr=False)
+    # Заполняются у корня при построении дерева через add_page_to_tree:
+    # все узлы по URL и последняя изменённая страница
+    _url_index: dict[str, TreeNode] = field(default_factory=dict, repr=False)
+    _latest_node: TreeNode | None = field(default=None, repr=False)
+    _url_path: str | None = field(default=None, init=False, repr=False)
+    _path_segments: tuple[str, ...] | None = field(default=None, init=False, repr=False)
 
     @property
     def sections(self) -> list[str]:
         """Секции внутри которых находится страница"""
-        url = str(self.url)
-        domain = urlparse(url).netloc
-        url = url.replace(domain, "").replace("http://", "").replace("https://", "")
-        return url.split("/")
+        # Путь начинается с "/", поэтому первый элемент, как и раньше, пустая строка
+        return self.url_path.split("/")
+
+    @property
+    def url_path(self) -> str:
+        """Путь страницы, URL разбирается один раз на узел"""
+        if self._url_path is None:
+            self._url_path = urlparse(self.url).path
+        return self._url_path
+
+    @property
+    def path_segments(self) -> tuple[str, ...]:
+        """Сегменты пути страницы,
+        пример: 'http://example.ru/services/3' -> ('services', '3')
+        """
+        if self._path_segments is None:
+            self._path_segments = tuple(
+                segment for segment in self.url_path.strip("/").split("/") if segment
+            )
+        return self._path_segments
 
     @property
     def is_leaf(self) -> bool:
@@ -109,22 +155,26 @@ class TreeNode(BaseModel):
 
     def max_depth(self) -> int:
         """Максимальная глубина дерева"""
-        if not self.children:
-            return 0
-        return max(child.max_depth() for child in self.children) + 1
+        depth = 0
+        queue: deque[tuple[TreeNode, int]] = deque([(self, 0)])
+        while queue:
+            node, node_depth = queue.popleft()
+            depth = max(depth, node_depth)
+            queue.extend((child, node_depth + 1) for child in node.children)
+        return depth
 
     def count_nodes(self) -> int:
         """Подсчитывает общее количество узлов в дереве"""
-        count = 1
-        for child in self.children:
-            count += child.count_nodes()
+        _, count = self._walk_stats()
         return count
 
     def iter_nodes(self) -> Iterator[TreeNode]:
         """Итерация по всем узлам дерева"""
-        yield self
-        for child in self.children:
-            yield from child.iter_nodes()
+        stack: list[TreeNode] = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
 
     def iter_leaves(self) -> Iterator[TreeNode]:
         """Итерация по листьям дерева"""
@@ -133,14 +183,12 @@ class TreeNode(BaseModel):
                 yield node
 
     def find_node(self, url: str) -> TreeNode | None:
-        """Рекурсивный поиск страницы по её URL"""
+        """Поиск страницы по её URL"""
         if self.url == url:
             return self
-        for child in self.children:
-            found = child.find_node(url)
-            if found:
-                return found
-        return None
+        if self._url_index:
+            return self._url_index.get(url)
+        return next((node for node in self.iter_nodes() if node.url == url), None)
 
     def to_string(self, max_depth: int | None = None) -> str:
         """Представление дерева в человеко-читаемом формате"""
@@ -157,42 +205,64 @@ class TreeNode(BaseModel):
         is_last: bool = True,
     ) -> None:
         """Формирует строковое представление для отображения дерева"""
-        if max_depth is not None and current_depth >= max_depth:
-            return
-        meta_parts: list[str] = []
-        if self.priority is not None:
-            meta_parts.append(f"Приоритет: {self.priority}")
-        if self.last_modified:
-            meta_parts.append(f"Последнее изменение: {self.last_modified.strftime('%d.%m.%Y')}")
-        meta_str = " [" + ", ".join(meta_parts) + "]" if meta_parts else ""
-        if current_depth == 0:
-            icon = "🌐"
-            line = f"{icon} {self.name} ({self.url}){meta_str}"
-            lines.append(line)
-        else:
-            icon = "📄" if self.is_leaf else "📁"
-            connector = "└── " if is_last else "├── "
-            line = f"{prefix}{connector}{icon} {self.name}{meta_str}"
-            lines.append(line)
-        new_prefix = prefix if current_depth == 0 else prefix + ("    " if is_last else "│   ")
-        for i, child in enumerate(self.children):
-            is_last_child = i == len(self.children) - 1
-            child.draw_tree_lines(lines, max_depth, current_depth + 1, new_prefix, is_last_child)
+        stack: list[tuple[TreeNode, int, str, bool]] = [(self, current_depth, prefix, is_last)]
+        while stack:
+            node, depth, node_prefix, node_is_last = stack.pop()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            meta_parts: list[str] = []
+            if node.priority is not None:
+                meta_parts.append(f"Приоритет: {node.priority}")
+            if node.last_modified:
+                meta_parts.append(
+                    f"Последнее изменение: {node.last_modified.strftime('%d.%m.%Y')}"
+                )
+            meta_str = " [" + ", ".join(meta_parts) + "]" if meta_parts else ""
+            if depth == 0:
+                icon = "🌐"
+                line = f"{icon} {node.name} ({node.url}){meta_str}"
+                lines.append(line)
+            else:
+                icon = "📄" if node.is_leaf else "📁"
+                connector = "└── " if node_is_last else "├── "
+                line = f"{node_prefix}{connector}{icon} {node.name}{meta_str}"
+                lines.append(line)
+            new_prefix = (
+                node_prefix if depth == 0 else node_prefix + ("    " if node_is_last else "│   ")
+            )
+            # Дочерние узлы кладутся в обратном порядке, чтобы выводиться по порядку
+            last_index = len(node.children) - 1
+            stack.extend(
+                (child, depth + 1, new_prefix, i == last_index)
+                for i, child in reversed(list(enumerate(node.children)))
+            )
+
+    def _walk_stats(self) -> tuple[TreeNode | None, int]:
+        """Последняя изменённая страница и количество узлов за один обход дерева"""
+        last_changed: TreeNode | None = None
+        count = 0
+        stack: deque[TreeNode] = deque([self])
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node.last_modified is not None and (
+                last_changed is None or node.last_modified > last_changed.last_modified  # type: ignore  # noqa: PGH003
+            ):
+                last_changed = node
+            stack.extend(reversed(node.children))
+        return last_changed, count
 
     def last_site_change(self) -> datetime | None:
         """Последнее изменение на сайте"""
-        latest = self.last_modified
-        for node in self.iter_nodes():
-            if node.last_modified and (latest is None or node.last_modified > latest):
-                latest = node.last_modified
-        return latest
+        last_changed = self.last_changed_node()
+        return last_changed.last_modified if last_changed is not None else None
 
     def last_changed_node(self) -> TreeNode | None:
         """Последняя изменённая страница"""
-        nodes: list[TreeNode] = [
-            node for node in self.iter_nodes() if node.last_modified is not None
-        ]
-        return max(nodes, key=lambda x: x.last_modified, default=None)  # type: ignore  # noqa: PGH003
+        if self._url_index:
+            return self._latest_node
+        last_changed, _ = self._walk_stats()
+        return last_changed
 
     def __hash__(self) -> int:
         return hash(self.url)
@@ -204,29 +274,88 @@ class TreeNode(BaseModel):
 
 
 def add_page_to_tree(
-    base_url: HttpUrl,
+    base_url: str,
     root: TreeNode,
     page: SitemapPage,
     segments: list[str],
-    current_depth: int = 0,
 ) -> None:
-    if current_depth >= len(segments):
-        return
-    current_segment = segments[current_depth]
-    node: TreeNode | None = next(
-        (child for child in root.children if child.name == current_segment), None
-    )
-    if node is None:
-        path_part = "/".join(segments[: current_depth + 1])
-        full_url = f"{str(base_url).rstrip('/')}/{path_part}"
-        node = TreeNode.model_validate({
-            "name": current_segment,
-            "url": full_url,
-            "priority": page.priority,
-            "last_modified": page.last_modified,
-        })
-        root.children.append(node)
-    add_page_to_tree(base_url, node, page, segments, current_depth + 1)
+    node = root
+    base_url = base_url.rstrip("/")
+    base_path = urlparse(base_url).path
+    base_segments = tuple(segment for segment in base_path.split("/") if segment)
+    path_part = ""
+    for depth, segment in enumerate(segments):
+        # Путь дочернего узла наращивается по сегменту, а не собирается заново
+        path_part = f"{path_part}/{segment}"
+        child = node._children_by_name.get(segment)  # noqa: SLF001
+        if child is None:
+            full_url = f"{base_url}{path_part}"
+            child = TreeNode(
+                name=segment,
+                url=full_url,
+                priority=page.priority,
+                last_modified=_parse_last_modified(page.last_modified),
+            )
+            # Путь и сегменты уже известны, поэтому URL узла не разбирается повторно
+            child._url_path = f"{base_path}{path_part}"  # noqa: SLF001
+            child._path_segments = base_segments + tuple(segments[: depth + 1])  # noqa: SLF001
+            node.children.append(child)
+            node._children_by_name[segment] = child  # noqa: SLF001
+            root._url_index[full_url] = child  # noqa: SLF001
+            latest = root._latest_node  # noqa: SLF001
+            if child.last_modified is not None and (
+                latest is None or child.last_modified > latest.last_modified  # type: ignore  # noqa: PGH003
+            ):
+                root._latest_node = child  # noqa: SLF001
+        node = child
+
+
+class PrefetchWebClient(AbstractWebClient):
+    """HTTP клиент usp, параллельно скачивающий вложенные sitemap.
+
+    usp обходит индекс sitemap последовательно, поэтому перед обходом
+    дочерние адреса скачиваются пулом потоков, а парсер получает готовые ответы.
+    """
+
+    def __init__(self, max_workers: int = SITEMAP_FETCH_WORKERS) -> None:
+        self._client = RequestsWebClient()
+        self._max_workers = max_workers
+        self._prefetched: dict[str, AbstractWebClientResponse] = {}
+        self._lock = threading.Lock()
+
+    def set_max_response_data_length(self, max_response_data_length: int | None) -> None:
+        self._client.set_max_response_data_length(max_response_data_length)  # type: ignore  # noqa: PGH003
+
+    def get(self, url: str) -> AbstractWebClientResponse:
+        with self._lock:
+            response = self._prefetched.pop(url, None)
+        return response if response is not None else self._client.get(url)
+
+    def _download(self, url: str) -> AbstractWebClientResponse:
+        response = self._client.get(url)
+        if isinstance(response, AbstractWebClientSuccessResponse):
+            # Тело читается сразу, чтобы освободить соединение
+            response.raw_data()
+        return response
+
+    def prefetch(self, urls: list[str], level: int, parent_urls: set[str]) -> list[str]:  # noqa: ARG002
+        """Колбэк recurse_list_callback для usp, заранее скачивающий дочерние sitemap.
+
+        :param urls: Адреса дочерних sitemap.
+        :param level: Уровень вложенности индекса.
+        :param parent_urls: Адреса родительских sitemap.
+        :return Адреса дочерних sitemap без изменений.
+        """
+        pending = [sitemap_url for sitemap_url in urls if sitemap_url not in parent_urls]
+        if len(pending) < 2:  # noqa: PLR2004
+            return urls
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            responses = list(executor.map(self._download, pending))
+        with self._lock:
+            for sitemap_url, response in zip(pending, responses, strict=True):
+                if isinstance(response, AbstractWebClientSuccessResponse):
+                    self._prefetched[sitemap_url] = response
+        return urls
 
 
 def build_site_tree(url: HttpUrl) -> TreeNode:
@@ -235,26 +364,24 @@ def build_site_tree(url: HttpUrl) -> TreeNode:
     :param url: URL адрес сайта.
     :return Построенное дерево структуры сайта.
     """
-    name = str(url).replace("http://", "").replace("https://", "").replace("/", "")
-    root = TreeNode(name=name, url=url)
-    sitemap = sitemap_tree_for_homepage(str(url), use_robots=False)
-    for page in sitemap.all_pages():
-        segments = parse_url_path(page.url)
-        add_page_to_tree(url, root, page, segments)
+    homepage_url = str(url)
+    name = homepage_url.replace("http://", "").replace("https://", "").replace("/", "")
+    root = TreeNode(name=name, url=homepage_url)
+    web_client = PrefetchWebClient()
+    sitemap = sitemap_tree_for_homepage(
+        homepage_url,
+        web_client=web_client,
+        use_robots=False,
+        recurse_list_callback=web_client.prefetch,
+    )
+    entries = [(parse_url_path(page.url), page) for page in sitemap.all_pages()]
+    # Страницы с общим префиксом пути вставляются подряд
+    entries.sort(key=lambda entry: entry[0])
+    for segments, page in entries:
+        add_page_to_tree(root.url, root, page, segments)
     return root
 
 
-def _get_path_segments(url: HttpUrl) -> list[str]:
-    """Получение сегментов URL адреса,
-    пример: 'http://example.ru/services/3' -> ['services', '3']
-
-    :param url: Адрес страницы для разбиения.
-    :return Секции на странице.
-    """
-    parsed = urlparse(str(url))
-    return [section for section in parsed.path.strip("/").split("/") if section]
-
-
 def _sort_by_last_modified(nodes: list[TreeNode]) -> list[TreeNode]:
     """Сортировка по последней дате изменений"""
     with_dates: list[TreeNode] = []
@@ -268,11 +395,10 @@ def _sort_by_last_modified(nodes: list[TreeNode]) -> list[TreeNode]:
     return with_dates + without_dates
 
 
-def _is_denied_url(url: HttpUrl) -> bool:
-    """Проверка URL на запрещённый, True если запрещён, False если разрешён"""
-    return not any(
-        str(url).split(".")[-1].lower().endswith(extension) for extension in DENIED_EXTENSIONS
-    )
+def _is_denied_path(path: str) -> bool:
+    """Проверка пути URL на запрещённый, True если запрещён, False если разрешён"""
+    _, extension = posixpath.splitext(path)
+    return extension.lower() in _DENIED_EXTENSIONS_SET
 
 
 def _get_node_sort_key(node: TreeNode) -> tuple[float, float, float]:
@@ -283,13 +409,13 @@ def _get_node_sort_key(node: TreeNode) -> tuple[float, float, float]:
     """
     priority_score = node.priority if node.priority is not None else 0.5
     date_score = node.last_modified.timestamp() if node.last_modified else 0
-    depth_penalty = len(_get_path_segments(node.url)) * 0.01
+    depth_penalty = len(node.path_segments) * 0.01
     return -priority_score, -date_score, depth_penalty
 
 
 def extract_key_pages(  # noqa: C901
     tree: TreeNode, key_segments: list[str], max_result: int = 15
-) -> list[HttpUrl]:
+) -> list[str]:
     """Извлекает URL ключевых страниц сайта.
 
     :param tree: Дерево сайта.
@@ -297,42 +423,43 @@ def extract_key_pages(  # noqa: C901
     :param max_result: Максимальное количество извлекаемых страниц.
     :return Уникальные ключевые URL адреса сайта.
     """
-    key_pages: set[HttpUrl] = {tree.url}  # Добавление главной страницы сайта
-    nodes_with_key_segments: list[TreeNode] = []  # Узлы содержащие ключевые сегменты
-    used_segments: set[str] = set()  # Использованные сегменты для избежания двойной обработки
+    key_pages: set[str] = {tree.url}  # Добавление главной страницы сайта
+    key_segments_set = set(key_segments)
+    # Лучший по сортировке узел для каждого ключевого сегмента, в итоговый список
+    # от одного сегмента попадает только он, поэтому полная сортировка не нужна
+    best_nodes: dict[str, tuple[tuple[float, float, float], TreeNode]] = {}
     # Добавление последней изменённой страницы
     last_changed_node = tree.last_changed_node()
     if last_changed_node is not None:
         key_pages.add(last_changed_node.url)
     for node in tree.iter_nodes():
-        if len(key_pages) > max_result:
-            break
-        segments = _get_path_segments(node.url)
+        segments = set(node.path_segments)
         # Проверка наличия ключевых сегментов в пути
-        has_key_segment = any(key_segment in segments for key_segment in key_segments)
-        if has_key_segment and _is_denied_url(node.url):
-            nodes_with_key_segments.append(node)
-    nodes_with_key_segments.sort(key=_get_node_sort_key)
-    for node_with_key_segment in nodes_with_key_segments:
-        if len(key_pages) >= max_result:
-            break
-        segments = _get_path_segments(node_with_key_segment.url)
+        if not segments & key_segments_set or _is_denied_path(node.url_path):
+            continue
         # Нахождение ключевого сегмента в узле
         found_key_segment = next(
-            (key_segment for key_segment in key_segments if key_segment in segments), None
+            key_segment for key_segment in key_segments if key_segment in segments
         )
-        if found_key_segment is not None and found_key_segment not in used_segments:
-            key_pages.add(node_with_key_segment.url)
-            used_segments.add(found_key_segment)
-            # Добавление свежих дочерних страниц из текущей директории
-            if not node_with_key_segment.is_leaf:
-                children = _sort_by_last_modified(node_with_key_segment.children)
-                for child in children:
-                    if len(key_pages) < max_result and _is_denied_url(child.url):
-                        key_pages.add(child.url)
+        sort_key = _get_node_sort_key(node)
+        best = best_nodes.get(found_key_segment)
+        if best is None or sort_key < best[0]:
+            best_nodes[found_key_segment] = (sort_key, node)
+    nodes_with_key_segments = [node for _, node in sorted(best_nodes.values(), key=itemgetter(0))]
+    for node_with_key_segment in nodes_with_key_segments:
+        if len(key_pages) >= max_result:
+            break
+        key_pages.add(node_with_key_segment.url)
+        # Добавление свежих дочерних страниц из текущей директории
+        if not node_with_key_segment.is_leaf:
+            children = _sort_by_last_modified(node_with_key_segment.children)
+            for child in children:
+                if len(key_pages) < max_result and not _is_denied_path(child.url_path):
+                    key_pages.add(child.url)
     # Если не набрано достаточное количество страниц, то добавляются популярные листья
     if len(key_pages) < max_result:
-        leaves = list(tree.iter_leaves())
-        leaves.sort(key=_get_node_sort_key)
-        key_pages.update(leaf.url for leaf in leaves[: max_result - len(key_pages)])
+        leaves = heapq.nsmallest(
+            max_result - len(key_pages), tree.iter_leaves(), key=_get_node_sort_key
+        )
+        key_pages.update(leaf.url for leaf in leaves)
     return list(key_pages)
@@ -1,10 +1,16 @@
+import asyncio
+import contextlib
 import random
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 import html_to_markdown
 from bs4 import BeautifulSoup
-from playwright.async_api import Browser, BrowserContext, Page
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+from playwright.async_api import Error as PlaywrightError
 
 from ...errors import PageParsingError
+from ...settings import settings
 
 FINGERPRINT_SPOOFING_SCRIPT = """
 () => {
@@ -106,6 +112,23 @@ SCREEN_RESOLUTIONS: tuple[dict[str, int], ...] = (
     {"width": 1440, "height": 900},
     {"width": 1280, "height": 720},
 )
+# Количество прогретых контекстов браузера, которые переиспользуются между страницами
+CONTEXT_POOL_SIZE = 4
+# После стольких использований контекст закрывается: IndexedDB, кэш и данные
+# сторонних фреймов нельзя надёжно очистить без пересоздания контекста
+CONTEXT_MAX_USES = 20
+# Очистка хранилищ и service workers источника открытой страницы
+CLEAR_STORAGE_SCRIPT = """
+async () => {
+    localStorage.clear();
+    sessionStorage.clear();
+    if (navigator.serviceWorker) {
+        for (const registration of await navigator.serviceWorker.getRegistrations()) {
+            await registration.unregister();
+        }
+    }
+}
+"""
 # Доступные языки для браузера
 LANGUAGES: tuple[str, ...] = (
     "en-US,en;q=0.9",
@@ -196,19 +219,117 @@ async def _create_new_stealth_context(browser: Browser) -> BrowserContext:
     return context
 
 
-async def _get_current_page(browser: Browser) -> Page:
-    """Получает текущую страницу в браузере.
+class ContextPool:
+    """Пул прогретых stealth контекстов браузера.
+
+    Создание контекста с init-скриптами дороже открытия страницы, поэтому
+    контексты возвращаются в очередь после использования. Перед возвратом
+    очищаются localStorage, sessionStorage и service workers открытых страниц,
+    закрываются все страницы, сбрасываются cookies и выданные разрешения.
+    Контекст пересоздаётся после CONTEXT_MAX_USES использований.
+    """
+
+    def __init__(self, size: int = CONTEXT_POOL_SIZE, max_uses: int = CONTEXT_MAX_USES) -> None:
+        self._queue: asyncio.Queue[BrowserContext] = asyncio.Queue(maxsize=size)
+        self._max_uses = max_uses
+        self._uses: dict[BrowserContext, int] = {}
+
+    async def acquire(self, browser: Browser) -> BrowserContext:
+        """Берёт контекст из пула или создаёт новый, если свободных нет"""
+        while True:
+            try:
+                context = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return await _create_new_stealth_context(browser)
+            # Контексты от предыдущего подключения уже недействительны
+            if context.browser is browser and browser.is_connected():
+                return context
+            self._uses.pop(context, None)
+
+    async def release(self, context: BrowserContext) -> None:
+        """Очищает контекст и возвращает его в пул"""
+        uses = self._uses.pop(context, 0) + 1
+        if context.browser is None or not context.browser.is_connected():
+            return
+        if uses >= self._max_uses:
+            await context.close()
+            return
+        for page in context.pages:
+            # Хранилище недоступно на страницах без источника (about:blank, ошибка загрузки)
+            with contextlib.suppress(PlaywrightError):
+                await page.evaluate(CLEAR_STORAGE_SCRIPT)
+            await page.close()
+        await context.clear_cookies()
+        await context.clear_permissions()
+        try:
+            self._queue.put_nowait(context)
+        except asyncio.QueueFull:
+            await context.close()
+        else:
+            self._uses[context] = uses
+
+    async def close(self) -> None:
+        """Закрывает все свободные контексты пула"""
+        while not self._queue.empty():
+            context = self._queue.get_nowait()
+            self._uses.pop(context, None)
+            if context.browser is not None and context.browser.is_connected():
+                await context.close()
+
+
+context_pool = ContextPool()
+
+
+class BrowserSession:
+    """Общее подключение к удалённому Playwright браузеру.
+
+    Подключение создаётся один раз при первом обращении и переиспользуется
+    всеми запросами, для каждой страницы открывается отдельный контекст.
+    """
+
+    def __init__(self) -> None:
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._lock = asyncio.Lock()
+
+    async def get_browser(self) -> Browser:
+        """Получает подключённый браузер, переподключаясь при обрыве соединения"""
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.connect(
+                    ws_endpoint=settings.chromium_ws_endpoint
+                )
+            return self._browser
+
+    async def close(self) -> None:
+        """Закрывает подключение к браузеру и останавливает Playwright"""
+        async with self._lock:
+            await context_pool.close()
+            if self._browser is not None:
+                await self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+browser_session = BrowserSession()
+
+
+@asynccontextmanager
+async def _open_page(browser: Browser) -> AsyncIterator[Page]:
+    """Открывает новую страницу в контексте из пула.
 
     :param browser: Playwright браузер.
-    :return Текущая страница.
+    :return Открытая страница, контекст которой возвращается в пул после использования.
     """
-    if not browser.contexts:
-        context = await _create_new_stealth_context(browser)
-        return await context.new_page()
-    context = browser.contexts[0]
-    if not context.pages:
-        return await context.new_page()
-    return context.pages[-1]
+    context = await context_pool.acquire(browser)
+    try:
+        yield await context.new_page()
+    finally:
+        await context_pool.release(context)
 
 
 def _extract_markdown(soup: BeautifulSoup) -> str:
@@ -227,6 +348,11 @@ def _extract_markdown(soup: BeautifulSoup) -> str:
     return "\n".join([html_to_markdown.convert(str(element))["content"] for element in elements])  # type: ignore  # noqa: PGH003
 
 
+def _html_to_markdown(html: str) -> str:
+    """Разбор HTML и извлечение Markdown, выполняется в рабочем потоке целиком"""
+    return _extract_markdown(BeautifulSoup(html, "lxml"))
+
+
 async def get_markdown_content(browser: Browser, url: str) -> str:
     """Получает контент со страницы в формате Markdown.
 
@@ -235,17 +361,16 @@ async def get_markdown_content(browser: Browser, url: str) -> str:
     :returns: Markdown контент страницы.
     """
 
-    page = await _get_current_page(browser)
-    await page.goto(url)
-    try:
-        await page.wait_for_load_state("networkidle", timeout=60000)
-        await page.wait_for_load_state("load", timeout=60000)
-        await page.wait_for_load_state("domcontentloaded", timeout=60000)
-    except Exception:  # noqa: BLE001
-        raise PageParsingError from None
-    page_content = await page.content()
-    soup = BeautifulSoup(page_content, "html.parser")
-    return _extract_markdown(soup)
+    async with _open_page(browser) as page:
+        await page.goto(url)
+        try:
+            await page.wait_for_load_state("networkidle", timeout=60000)
+            await page.wait_for_load_state("load", timeout=60000)
+            await page.wait_for_load_state("domcontentloaded", timeout=60000)
+        except Exception:  # noqa: BLE001
+            raise PageParsingError from None
+        page_content = await page.content()
+    return await asyncio.to_thread(_html_to_markdown, page_content)
 
 
 async def get_html_content(browser: Browser, url: str) -> str:
@@ -256,12 +381,25 @@ async def get_html_content(browser: Browser, url: str) -> str:
     :returns: HTML контент страницы.
     """
 
-    page = await _get_current_page(browser)
-    await page.goto(url, timeout=60000)
-    try:
-        await page.wait_for_load_state("networkidle", timeout=60000)
-        await page.wait_for_load_state("load", timeout=60000)
-        await page.wait_for_load_state("domcontentloaded", timeout=60000)
-    except Exception:  # noqa: BLE001
-        raise PageParsingError from None
-    return await page.content()
+    async with _open_page(browser) as page:
+        await page.goto(url, timeout=60000)
+        try:
+            await page.wait_for_load_state("networkidle", timeout=60000)
+            await page.wait_for_load_state("load", timeout=60000)
+            await page.wait_for_load_state("domcontentloaded", timeout=60000)
+        except Exception:  # noqa: BLE001
+            raise PageParsingError from None
+        return await page.content()
+
+
+async def get_html_and_markdown(browser: Browser, url: str) -> tuple[str, str]:
+    """Получает HTML и Markdown контент страницы за одну навигацию.
+
+    :param browser: Текущее состояние Playwright браузера.
+    :param url: URL адрес страницы, которую нужно открыть.
+    :returns: HTML и Markdown контент страницы.
+    """
+
+    html = await get_html_content(browser, url)
+    markdown = await asyncio.to_thread(_html_to_markdown, html)
+    return html, markdown
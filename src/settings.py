@@ -2,7 +2,7 @@ from pathlib import Path
 from typing import Literal
 
 import pytz
-from dotenv import load_dotenv
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 TIMEZONE = "Asia/Yekaterinburg"
@@ -13,11 +13,12 @@ CHROMA_PATH = BASE_DIR / ".chroma"
 SQLITE_PATH = BASE_DIR / "checkpoint.sqlite"
 INVITATION_EXPIRES_IN_DAYS = 7
 TEMPLATES_DIR = BASE_DIR / "templates"
-load_dotenv(ENV_PATH)
+# Общие параметры чтения .env для всех групп настроек
+ENV_CONFIG = SettingsConfigDict(env_file=ENV_PATH, env_file_encoding="utf-8", extra="ignore")
 
 
 class PostgresSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="POSTGRES_")
+    model_config = SettingsConfigDict(**ENV_CONFIG, env_prefix="POSTGRES_")
 
     host: str = "postgres"
     port: int = 5432
@@ -32,14 +33,14 @@ class PostgresSettings(BaseSettings):
 
 
 class GoogleSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="GOOGLE_")
+    model_config = SettingsConfigDict(**ENV_CONFIG, env_prefix="GOOGLE_")
 
     base_url: str = "https://www.googleapis.com"
     psi_api_key: str = "<API_KEY>"
 
 
 class RabbitSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="RABBITMQ_")
+    model_config = SettingsConfigDict(**ENV_CONFIG, env_prefix="RABBITMQ_")
 
     user: str = "user"
     password: str = "password"
@@ -50,19 +51,21 @@ class RabbitSettings(BaseSettings):
 
 
 class YandexCloudSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="YANDEX_CLOUD_")
+    model_config = SettingsConfigDict(**ENV_CONFIG, env_prefix="YANDEX_CLOUD_")
 
     folder_id: str = "<FOLDER_ID>"
     api_key: str = "<API_KEY>"
 
 
 class JWTSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
     access_token_expires_in_minutes: int = 30
     refresh_token_expires_in_days: int = 30
 
 
 class AppSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="APP_")
+    model_config = SettingsConfigDict(**ENV_CONFIG, env_prefix="APP_")
 
     name: str = "ДИО-Консалт"
     port: int = 8000
@@ -77,7 +80,7 @@ class AppSettings(BaseSettings):
 
 
 class MailSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="MAIL_")
+    model_config = SettingsConfigDict(**ENV_CONFIG, env_prefix="MAIL_")
 
     smtp_host: str = "localhost"
     smtp_port: int = 1025
@@ -89,13 +92,15 @@ class MailSettings(BaseSettings):
 
 
 class Settings(BaseSettings):
-    postgres: PostgresSettings = PostgresSettings()
-    google: GoogleSettings = GoogleSettings()
-    yandexcloud: YandexCloudSettings = YandexCloudSettings()
-    rabbit: RabbitSettings = RabbitSettings()
-    jwt: JWTSettings = JWTSettings()
-    app: AppSettings = AppSettings()
-    mail: MailSettings = MailSettings()
+    model_config = ENV_CONFIG
+
+    postgres: PostgresSettings = Field(default_factory=PostgresSettings)
+    google: GoogleSettings = Field(default_factory=GoogleSettings)
+    yandexcloud: YandexCloudSettings = Field(default_factory=YandexCloudSettings)
+    rabbit: RabbitSettings = Field(default_factory=RabbitSettings)
+    jwt: JWTSettings = Field(default_factory=JWTSettings)
+    app: AppSettings = Field(default_factory=AppSettings)
+    mail: MailSettings = Field(default_factory=MailSettings)
     secret_key: str = "<SECRET_KEY>"
     chromium_ws_endpoint: str = "ws://localhost:3000/playwright/chromium"
     frontend_url: str = "http://localhost:5173"
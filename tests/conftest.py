@@ -0,0 +1,34 @@
+"""Общие настройки тестов.
+
+Импорт пакета src загружает модель эмбеддингов и открывает хранилище Chroma.
+В тестах модель подменяется лёгкой заглушкой, а Chroma работает в памяти,
+чтобы тесты не скачивали модель и не создавали файлы в репозитории.
+"""
+
+import chromadb
+import numpy as np
+import sentence_transformers
+
+EMBEDDING_DIM = 8
+
+
+class FakeSentenceTransformer:
+    """Заглушка SentenceTransformer с детерминированными эмбеддингами"""
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        pass
+
+    def _encode(self, sentences: str | list[str], **kwargs: object) -> np.ndarray:  # noqa: ARG002
+        texts = [sentences] if isinstance(sentences, str) else sentences
+        vectors = np.array(
+            [[(hash(text) >> shift) % 97 + 1 for shift in range(EMBEDDING_DIM)] for text in texts],
+            dtype=np.float32,
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+    encode = encode_query = encode_document = _encode
+
+
+sentence_transformers.SentenceTransformer = FakeSentenceTransformer  # type: ignore  # noqa: PGH003
+chromadb.PersistentClient = lambda *args, **kwargs: chromadb.EphemeralClient()  # type: ignore  # noqa: PGH003, ARG005
@@ -0,0 +1,52 @@
+import lxml.html
+import pytest
+from extruct.jsonld import JsonLdExtractor  # type: ignore  # noqa: PGH003
+
+from src.seo.utils.checkup import _extract_json_ld, _extract_json_ld_items, get_json_ld
+
+
+def wrap(*scripts: str) -> str:
+    body = "".join(f'<script type="application/ld+json">{script}</script>' for script in scripts)
+    return f"<html><head>{body}</head><body></body></html>"
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        wrap('{"@type": "Organization", "name": "Пример"}'),
+        wrap('[{"@type": "WebSite"}, {"@type": "BreadcrumbList"}]'),
+        wrap("{}"),
+        wrap("[]"),
+        wrap("null"),
+        wrap("42"),
+        wrap('"строка"'),
+        wrap('[{}, null, 0, {"@type": "Product"}, "x"]'),
+        wrap("{}", '{"@type": "Article"}', "null"),
+        "<html><body><p>Без разметки</p></body></html>",
+    ],
+)
+def test_extract_json_ld_matches_extruct(html: str) -> None:
+    assert _extract_json_ld(html) == JsonLdExtractor().extract(html)
+
+
+def test_get_json_ld_falls_back_to_extruct() -> None:
+    html = wrap('<!-- комментарий -->\n{"@type": "Event", "name": "Концерт"}')
+
+    assert _extract_json_ld(html) is None
+    assert get_json_ld(html) == [{"@type": "Event", "name": "Концерт"}]
+
+
+def test_extract_json_ld_uses_all_text_nodes() -> None:
+    tree = lxml.html.fromstring(wrap('{"@type": "Person", '))
+    script = tree.find(".//script")
+    child = lxml.html.Element("span")
+    child.text = '"name": '
+    child.tail = '"Иван"}'
+    script.append(child)
+
+    assert _extract_json_ld_items(tree) == JsonLdExtractor().extract_items(tree)
+    assert _extract_json_ld_items(tree) == [{"@type": "Person", "name": "Иван"}]
+
+
+def test_extract_json_ld_falls_back_on_invalid_json() -> None:
+    assert _extract_json_ld(wrap("{invalid")) is None
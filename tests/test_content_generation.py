@@ -0,0 +1,94 @@
+from typing import Any
+
+import pytest
+from langchain.messages import AIMessage
+
+from src.seo.agents.subagents import content_generation
+
+HTML_WITH_ISSUES = """<html><head><title>Short</title></head>
+<body><h2>Без H1</h2><img src="/img/photo"><img src="/logo.png" alt="Логотип"></body></html>"""
+
+HTML_WITHOUT_ISSUES = f"""<html><head>
+<title>{"t" * 55}</title>
+<meta name="description" content="{"d" * 140}">
+</head><body><h1>Заголовок</h1><h2>Раздел</h2></body></html>"""
+
+
+class FakeLLM:
+    def __init__(self) -> None:
+        self.requests: list[str] = []
+
+    async def ainvoke(self, request: str) -> AIMessage:
+        self.requests.append(request)
+        return AIMessage(
+            content="generated",
+            usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10},
+        )
+
+
+@pytest.fixture
+def llm(monkeypatch: pytest.MonkeyPatch) -> FakeLLM:
+    fake = FakeLLM()
+    monkeypatch.setattr(content_generation, "gpt_oss_120b", fake)
+    return fake
+
+
+def make_state(html: str) -> dict[str, Any]:
+    return {"url": "https://example.ru/page", "html": html, "markdown": ["markdown"]}
+
+
+@pytest.mark.parametrize(
+    ("node", "key"),
+    [
+        (content_generation.create_title, "title"),
+        (content_generation.create_description, "description"),
+        (content_generation.create_h1, "h1"),
+    ],
+)
+async def test_generation_node_calls_llm_for_issues(node: Any, key: str, llm: FakeLLM) -> None:
+    result = await node(make_state(HTML_WITH_ISSUES))
+
+    assert result[key] == "generated"
+    assert result["total_tokens"] == 10
+    assert len(llm.requests) == 1
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        content_generation.create_title,
+        content_generation.create_description,
+        content_generation.create_h1,
+    ],
+)
+async def test_generation_node_skips_llm_without_issues(node: Any, llm: FakeLLM) -> None:
+    await node(make_state(HTML_WITHOUT_ISSUES))
+
+    assert llm.requests == []
+
+
+async def test_create_alts_collects_images_without_alt(monkeypatch: pytest.MonkeyPatch) -> None:
+    received: list[list[str]] = []
+
+    async def fake_process_all_images(urls: list[str]) -> tuple[list[str], int]:
+        received.append(urls)
+        return ["alt"], 5
+
+    monkeypatch.setattr(content_generation, "process_all_images", fake_process_all_images)
+
+    result = await content_generation.create_alts(make_state(HTML_WITH_ISSUES))
+
+    assert received == [["https://example.ru/img/photo"]]
+    assert result["alt_tags"] == ["alt"]
+    assert result["total_tokens"] == 5
+
+
+async def test_create_alts_without_images(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def fail_process_all_images(urls: list[str]) -> tuple[list[str], int]:
+        raise AssertionError(urls)
+
+    monkeypatch.setattr(content_generation, "process_all_images", fail_process_all_images)
+
+    result = await content_generation.create_alts(make_state(HTML_WITHOUT_ISSUES))
+
+    assert isinstance(result["alt_tags"], str)
@@ -0,0 +1,75 @@
+from typing import Any
+
+import aiohttp
+import orjson
+import pytest
+
+from src.seo.integrations import google_psi_api
+
+REPORT = {"loadingExperience": {"overall_category": "FAST"}}
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: dict[str, Any]) -> None:
+        self.status = status
+        self._body = orjson.dumps(body)
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:  # noqa: PLR2004
+            raise aiohttp.ClientResponseError(None, (), status=self.status)  # type: ignore  # noqa: PGH003
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, *responses: FakeResponse) -> None:
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, **kwargs: object) -> FakeResponse:
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def session(monkeypatch: pytest.MonkeyPatch) -> FakeSession:
+    fake = FakeSession()
+
+    async def get_session() -> FakeSession:
+        return fake
+
+    monkeypatch.setattr(google_psi_api.http_session, "get_session", get_session)
+    return fake
+
+
+async def test_error_response_is_raised_and_not_cached(session: FakeSession) -> None:
+    session.responses = [FakeResponse(429, {"error": {"code": 429}}), FakeResponse(200, REPORT)]
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await google_psi_api.run_page_speed("https://example.ru/error")
+
+    assert await google_psi_api.run_page_speed("https://example.ru/error") == REPORT
+    assert session.calls == 2
+
+
+async def test_empty_report_is_not_cached(session: FakeSession) -> None:
+    session.responses = [FakeResponse(200, {}), FakeResponse(200, REPORT)]
+
+    assert await google_psi_api.run_page_speed("https://example.ru/empty") == {}
+    assert await google_psi_api.run_page_speed("https://example.ru/empty") == REPORT
+
+
+async def test_report_is_cached(session: FakeSession) -> None:
+    session.responses = [FakeResponse(200, REPORT)]
+
+    await google_psi_api.run_page_speed("https://example.ru/ok")
+
+    assert await google_psi_api.run_page_speed("https://example.ru/ok") == REPORT
+    assert session.calls == 1
@@ -0,0 +1,47 @@
+import pytest
+from langchain.messages import AIMessage
+
+from src.seo.core import semantic_cache
+
+
+class FakeLLM:
+    model_name = "fake"
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    requests: list[str] = []
+
+    async def fake_cached_invoke(llm: FakeLLM, request: str) -> AIMessage:  # noqa: ARG001
+        requests.append(request)
+        return AIMessage(content=f"answer {len(requests)}")
+
+    monkeypatch.setattr(semantic_cache, "cached_invoke", fake_cached_invoke)
+    monkeypatch.setattr(semantic_cache, "_caches", {})
+    return requests
+
+
+async def test_answer_is_reused_for_the_same_site(calls: list[str]) -> None:
+    robots = "User-agent: *\nDisallow: /admin"
+    first = await semantic_cache.semantic_cached_invoke(
+        FakeLLM(), "request", content=robots, namespace="robots", site_url="https://a.ru/"
+    )
+    second = await semantic_cache.semantic_cached_invoke(
+        FakeLLM(), "request", content=robots, namespace="robots", site_url="https://a.ru/page"
+    )
+
+    assert len(calls) == 1
+    assert second.content == first.content
+
+
+async def test_answer_is_not_shared_between_sites(calls: list[str]) -> None:
+    robots = "User-agent: *\nDisallow: /admin"
+    first = await semantic_cache.semantic_cached_invoke(
+        FakeLLM(), "request", content=robots, namespace="robots", site_url="https://a.ru/"
+    )
+    second = await semantic_cache.semantic_cached_invoke(
+        FakeLLM(), "request", content=robots, namespace="robots", site_url="https://b.ru/"
+    )
+
+    assert len(calls) == 2  # noqa: PLR2004
+    assert second.content != first.content
@@ -0,0 +1,57 @@
+from typing import Any
+from uuid import uuid4
+
+import pytest
+
+from src.seo.api.routers import seo
+
+
+class FakeRepository:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+        self.created: list[Any] = []
+
+    async def create(self, entity: Any) -> None:
+        if self.error is not None:
+            raise self.error
+        self.created.append(entity)
+
+
+@pytest.fixture
+def deleted(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+    calls: list[list[str]] = []
+    monkeypatch.setattr(seo.rag, "delete_documents", calls.append)
+    return calls
+
+
+def patch_indexing(monkeypatch: pytest.MonkeyPatch, error: Exception | None = None) -> None:
+    async def indexing(text: str, metadata: dict[str, Any] | None = None) -> list[str]:
+        if error is not None:
+            raise error
+        return ["chunk-1", "chunk-2"]
+
+    monkeypatch.setattr(seo.rag, "indexing", indexing)
+
+
+async def test_save_result_keeps_db_row_when_indexing_fails(
+    monkeypatch: pytest.MonkeyPatch, deleted: list[list[str]]
+) -> None:
+    patch_indexing(monkeypatch, RuntimeError("chroma"))
+    repository = FakeRepository()
+
+    await seo._save_result(repository, uuid4(), "gen", "{}", {"generation_id": "gen"})  # type: ignore  # noqa: PGH003
+
+    assert len(repository.created) == 1
+    assert deleted == []
+
+
+async def test_save_result_removes_index_when_db_write_fails(
+    monkeypatch: pytest.MonkeyPatch, deleted: list[list[str]]
+) -> None:
+    patch_indexing(monkeypatch)
+    repository = FakeRepository(RuntimeError("db"))
+
+    with pytest.raises(RuntimeError, match="db"):
+        await seo._save_result(repository, uuid4(), "gen", "{}", {"generation_id": "gen"})  # type: ignore  # noqa: PGH003
+
+    assert deleted == [["chunk-1", "chunk-2"]]
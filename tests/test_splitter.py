@@ -0,0 +1,87 @@
+import random
+
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.seo.utils.splitter import FastTextSplitter
+
+CHUNK_SIZE = 100
+CHUNK_OVERLAP = 50
+
+
+def random_words(seed: int) -> str:
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choices("абвгде", k=rng.randint(1, 8))) for _ in range(2000))
+
+
+def random_paragraphs(seed: int) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join("с" * rng.randint(1, 12) for _ in range(rng.randint(1, 30))) for _ in range(100)
+    )
+
+
+def random_long_tokens(seed: int) -> str:
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choices("абвгде", k=rng.randint(20, 150))) for _ in range(50))
+
+
+RANDOM_TEXTS = {
+    "words": random_words(1),
+    "paragraphs": random_paragraphs(2),
+    # Слова длиннее окна режутся по его границе
+    "long_tokens": random_long_tokens(3),
+}
+TEXTS = {
+    **RANDOM_TEXTS,
+    # Разделитель абзацев попадает сразу за перекрытием предыдущего чанка
+    "separator_after_overlap": ("ab " * 40 + "\n\n") * 10,
+    "short_and_long_tokens": ("x" * 25 + " " + "y" * 90 + " ") * 30,
+}
+
+
+@pytest.fixture(params=list(TEXTS), ids=list(TEXTS))
+def text(request: pytest.FixtureRequest) -> str:
+    return TEXTS[request.param]
+
+
+def split(text: str) -> tuple[list[str], list[str]]:
+    kwargs = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+    return (
+        FastTextSplitter(**kwargs).split_text(text),
+        RecursiveCharacterTextSplitter(**kwargs).split_text(text),
+    )
+
+
+def test_chunks_fit_chunk_size(text: str) -> None:
+    fast, _ = split(text)
+
+    assert max(map(len, fast)) <= CHUNK_SIZE
+
+
+def test_chunks_are_not_shorter_than_half_window(text: str) -> None:
+    fast, recursive = split(text)
+
+    assert min(map(len, fast[:-1])) >= CHUNK_SIZE // 2
+    assert min(map(len, fast[:-1])) >= min(map(len, recursive[:-1]))
+
+
+def test_chunk_count_close_to_recursive_splitter(text: str) -> None:
+    fast, recursive = split(text)
+
+    assert len(fast) <= len(recursive) * 1.25
+
+
+# Тексты без повторов, чтобы положение чанка в тексте определялось однозначно
+@pytest.mark.parametrize("text", list(RANDOM_TEXTS.values()), ids=list(RANDOM_TEXTS))
+def test_chunks_cover_whole_text(text: str) -> None:
+    fast, _ = split(text)
+    covered = [False] * len(text)
+    position = 0
+    for chunk in fast:
+        start = text.find(chunk, position)
+        assert start != -1
+        covered[start : start + len(chunk)] = [True] * len(chunk)
+        position = start + 1
+
+    assert all(covered[index] for index, char in enumerate(text) if not char.isspace())
@@ -0,0 +1,71 @@
+from playwright.async_api import Error as PlaywrightError
+
+from src.seo.utils.web_parser import CLEAR_STORAGE_SCRIPT, ContextPool
+
+
+class FakeBrowser:
+    def is_connected(self) -> bool:
+        return True
+
+
+class FakePage:
+    def __init__(self, context: "FakeContext", blank: bool = False) -> None:
+        self.context = context
+        self.blank = blank
+        self.scripts: list[str] = []
+
+    async def evaluate(self, script: str) -> None:
+        if self.blank:
+            raise PlaywrightError("SecurityError")
+        self.scripts.append(script)
+
+    async def close(self) -> None:
+        self.context.open_pages.remove(self)
+
+
+class FakeContext:
+    def __init__(self, browser: FakeBrowser) -> None:
+        self.browser = browser
+        self.open_pages: list[FakePage] = []
+        self.calls: list[str] = []
+
+    @property
+    def pages(self) -> list[FakePage]:
+        return list(self.open_pages)
+
+    async def clear_cookies(self) -> None:
+        self.calls.append("clear_cookies")
+
+    async def clear_permissions(self) -> None:
+        self.calls.append("clear_permissions")
+
+    async def close(self) -> None:
+        self.calls.append("close")
+
+
+async def test_release_clears_context_state() -> None:
+    browser = FakeBrowser()
+    pool = ContextPool(size=1)
+    context = FakeContext(browser)
+    page = FakePage(context)
+    context.open_pages = [page, FakePage(context, blank=True)]
+
+    await pool.release(context)  # type: ignore  # noqa: PGH003
+
+    assert page.scripts == [CLEAR_STORAGE_SCRIPT]
+    assert context.pages == []
+    assert context.calls == ["clear_cookies", "clear_permissions"]
+    assert await pool.acquire(browser) is context  # type: ignore  # noqa: PGH003
+
+
+async def test_release_recycles_context_after_max_uses() -> None:
+    browser = FakeBrowser()
+    pool = ContextPool(size=1, max_uses=2)
+    context = FakeContext(browser)
+
+    await pool.release(context)  # type: ignore  # noqa: PGH003
+    assert await pool.acquire(browser) is context  # type: ignore  # noqa: PGH003
+    await pool.release(context)  # type: ignore  # noqa: PGH003
+
+    assert context.calls[-1] == "close"
+    assert pool._queue.empty()
@@ -0,0 +1,43 @@
+from typing import Any
+
+import pytest
+
+from src.seo.agents import workflow
+
+PAGE_SPEED = {"lighthouseResult": {"audits": {}}}
+
+
+class FakeAgent:
+    def __init__(self, result: dict[str, Any]) -> None:
+        self.result = result
+        self.inputs: list[dict[str, Any]] = []
+
+    async def ainvoke(self, state: dict[str, Any]) -> dict[str, Any]:
+        self.inputs.append(state)
+        return {**state, **self.result, "total_tokens": 1, "total_money": 0.1}
+
+
+@pytest.fixture
+def seo_agent(monkeypatch: pytest.MonkeyPatch) -> FakeAgent:
+    async def parce_site_markups(url: str) -> tuple[list[str], str]:
+        return ["markdown"], "<html></html>"
+
+    async def run_page_speed(url: str) -> dict:
+        return PAGE_SPEED
+
+    agent = FakeAgent({"result": {"score": 1}})
+    monkeypatch.setattr(workflow, "parce_site_markups", parce_site_markups)
+    monkeypatch.setattr(workflow, "run_page_speed", run_page_speed)
+    monkeypatch.setattr(workflow, "agent_analyst", FakeAgent({}))
+    monkeypatch.setattr(workflow, "agent_seo", agent)
+    monkeypatch.setattr(workflow, "agent_content_generation", FakeAgent({}))
+    return agent
+
+
+async def test_page_speed_is_not_returned_from_workflow(seo_agent: FakeAgent) -> None:
+    result = await workflow.agent.ainvoke({"url": "https://example.ru"})  # type: ignore  # noqa: PGH003
+
+    assert seo_agent.inputs[0]["page_speed"] == PAGE_SPEED
+    assert "page_speed" not in result
+    assert result["seo_result"] == {"score": 1}
+    assert result["total_tokens"] == 3